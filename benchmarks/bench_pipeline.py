@@ -0,0 +1,387 @@
+"""Benchmark the Nixle scrape-to-entity pipeline without network access.
+
+Pages from benchmarks/corpus.py are served by a local aiohttp server and
+each stage of the pipeline is timed on its own:
+
+    fetch      download a page, hash its alert region and parse it
+    unchanged  download a page whose alert region hash is known, without parsing
+    parse      parse_alerts on the whole page
+    feed       parse_feed on an RSS feed of the same alerts
+    records    create_alerts on the parsed rows
+    count      count_alerts on the alert records
+    expiry     evaluate the expiry rules for every alert, without the cache
+    per_rule   the same with a regex search per rule, as before ExpiryRuleSet
+    snapshot   build_snapshot from the API result
+    cluster    index the alerts for cross-agency deduplication
+    keywords   match every alert against KEYWORDS, without the per-alert cache
+    render     state and attributes of every entity for the snapshot
+
+Run from the repository root in an environment with Home Assistant:
+
+    python benchmarks/bench_pipeline.py --output bench.json
+    python benchmarks/bench_pipeline.py --compare bench.json
+
+--compare exits with status 1 if any stage lost more than --threshold
+percent of its ops/sec against the saved results.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import re
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from corpus import PAGE_SIZES, agency_feed, agency_page  # noqa: E402
+
+from custom_components.nixle.alert_dates import (  # noqa: E402
+    EXPIRY_RULES,
+    MONTHS,
+    get_expiry_rule_set,
+)
+from custom_components.nixle.alert_parser import parse_alerts  # noqa: E402
+from custom_components.nixle.binary_sensor import NixleActiveAlertSensor  # noqa: E402
+from custom_components.nixle.clustering import AlertClusterIndex  # noqa: E402
+from custom_components.nixle.expiry import ActiveAlerts  # noqa: E402
+from custom_components.nixle.feed_reader import parse_feed  # noqa: E402
+from custom_components.nixle.keywords import KeywordSubscriptions  # noqa: E402
+from custom_components.nixle.models import build_snapshot, create_alerts  # noqa: E402
+from custom_components.nixle.const import DEFAULT_MAX_PAGE_SIZE  # noqa: E402
+from custom_components.nixle.nixle_api import count_alerts  # noqa: E402
+from custom_components.nixle.page_reader import (  # noqa: E402
+    alert_region_hash,
+    async_read_alert_rows,
+)
+from custom_components.nixle.sensor import (  # noqa: E402
+    NixleAlertCountSensor,
+    NixleLatestAlertSensor,
+    NixleTotalAlertsSensor,
+)
+from homeassistant.util import dt as dt_util  # noqa: E402
+
+# Keyword subscriptions matched by the keywords stage
+KEYWORDS = (
+    "snow emergency", "parking ban", "boil water", "road closed", "power outage",
+    "missing person", "shelter in place", "evacuation", "water main break", "street sweeping",
+)
+
+# Patterns of the per_rule stage, searched one after the other
+PER_RULE_PATTERNS = (
+    r"tonight,\s+\w+,\s+(\w+)\s+(\d{1,2})(?:st|nd|rd|th)?(?:,\s+(\d{4}))?",
+    r"(?:for|declared)\s+\w+\s+night,\s+(\w+)\s+(\d{1,2})(?:st|nd|rd|th)?(?:,?\s+(\d{4}))?",
+    r"for\s+\w+,\s+(\w+)\s+(\d{1,2})(?:st|nd|rd|th)?(?:,\s+(\d{4}))?",
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Iterations per stage, by page size
+ITERATIONS = {
+    "small": 500,
+    "typical": 200,
+    "pathological": 5,
+}
+
+
+async def start_server(pages: dict[str, str]) -> tuple[web.AppRunner, str]:
+    """Serve each page at /<size>/ on a free local port."""
+
+    async def handle(request: web.Request) -> web.Response:
+        return web.Response(text=pages[request.match_info["size"]], content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/{size}/", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+def summarize(samples: list[float], traced_peak: int) -> dict:
+    """Return the statistics of a stage from per-operation durations."""
+    samples = sorted(samples)
+    total = sum(samples)
+    return {
+        "iterations": len(samples),
+        "ops_per_sec": round(len(samples) / total, 2) if total else None,
+        "p50_ms": round(statistics.median(samples) * 1000, 4),
+        "p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000, 4),
+        "peak_alloc_kib": round(traced_peak / 1024, 1),
+        # High-water mark of the whole process so far
+        "peak_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def traced_peak(func) -> int:
+    """Return the peak memory allocated while running func once."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def time_stage(func, iterations: int) -> dict:
+    """Time a synchronous stage."""
+    peak = traced_peak(func)
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples, peak)
+
+
+def per_rule_evaluate(text: str, posted: datetime, now: datetime) -> tuple[str, datetime] | None:
+    """Evaluate the expiry of an alert the way alert_dates did before ExpiryRuleSet.
+
+    Each rule is a separate re.search in priority order, and the debug
+    message is formatted eagerly.
+    """
+    for rule, pattern in zip(EXPIRY_RULES, PER_RULE_PATTERNS):
+        match = re.search(pattern, text, re.IGNORECASE)
+        if not match:
+            continue
+        month_name, day, year = match.groups()
+        year = int(year) if year else posted.year
+        month = MONTHS.get(month_name, posted.month)
+        day = int(day)
+        try:
+            alert_date = dt_util.as_local(datetime(year, month, day, 0, 0, 0))
+        except ValueError as err:
+            _LOGGER.warning(f"Invalid date parsed: {year}/{month}/{day} - {err}")
+            return None
+        expiry = alert_date.replace(hour=6, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        _LOGGER.debug(f"Parsed '{rule.rule_id}' alert: date={alert_date.date()}, expires={expiry}, now={now}")
+        return rule.rule_id, expiry
+    return None
+
+
+async def run_parser(func, *args):
+    """Run a parser step in the executor, as NixleAPI does."""
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+async def time_fetch(
+    session: aiohttp.ClientSession, url: str, iterations: int, known_hash: str | None = None
+) -> dict:
+    """Time downloading and parsing a page from the stub server."""
+
+    async def fetch() -> None:
+        async with session.get(url) as response:
+            await async_read_alert_rows(
+                response, DEFAULT_MAX_PAGE_SIZE * 1024, run_parser, None, known_hash
+            )
+
+    samples = []
+    tracemalloc.start()
+    try:
+        await fetch()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await fetch()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples, peak)
+
+
+def index_alerts(alerts) -> AlertClusterIndex:
+    """Return a cluster index holding the alerts of one agency."""
+    index = AlertClusterIndex()
+    index.update("bench", alerts)
+    return index
+
+
+def render_entities(snapshot):
+    """Return a function rendering every entity of an entry for a snapshot."""
+    index = index_alerts(snapshot.alerts)
+    active = ActiveAlerts()
+    active.reset(snapshot.expiring, dt_util.now())
+    coordinator = SimpleNamespace(
+        data=snapshot,
+        active=active,
+        update_interval=timedelta(minutes=15),
+        scheduler=SimpleNamespace(interval=timedelta(minutes=15)),
+        last_update_success=True,
+        data_available=True,
+        stale_since=None,
+        distinct_alerts=lambda alerts, limit=None: index.distinct("bench", alerts, limit),
+    )
+    entry = SimpleNamespace(entry_id="bench", data={"agency_url": "http://bench/"})
+    entities = [
+        NixleTotalAlertsSensor(coordinator, entry, "Bench", "bench"),
+        *(
+            NixleAlertCountSensor(coordinator, entry, "Bench", "bench", alert_type)
+            for alert_type in ("alert", "advisory", "community")
+        ),
+        NixleLatestAlertSensor(coordinator, entry, "Bench", "bench", ["alert"]),
+        NixleActiveAlertSensor(coordinator, entry, "Bench", "bench"),
+    ]
+
+    def render() -> None:
+        # A new snapshot is rendered after each refresh, so start cold
+        snapshot._filtered.clear()
+        for entity in entities:
+            entity.state  # noqa: B018
+            entity.extra_state_attributes  # noqa: B018
+
+    return render
+
+
+async def run(sizes: list[str], scale: float) -> dict:
+    """Run every stage for each page size."""
+    pages = {size: agency_page(PAGE_SIZES[size]) for size in sizes}
+    runner, base_url = await start_server(pages)
+    results = {}
+    try:
+        async with aiohttp.ClientSession() as session:
+            for size in sizes:
+                iterations = max(1, int(ITERATIONS[size] * scale))
+                html = pages[size]
+                feed = agency_feed(PAGE_SIZES[size]).encode()
+                rows = parse_alerts(html)
+                alerts = create_alerts(rows)
+                result = {
+                    "alerts": alerts,
+                    "counts": count_alerts(alerts),
+                    "last_updated": dt_util.now().isoformat(),
+                }
+                now = dt_util.now()
+                snapshot = build_snapshot(result)
+
+                rule_set = get_expiry_rule_set()
+
+                def evaluate_all() -> None:
+                    for alert in alerts:
+                        rule_set.evaluate(alert.text, alert.posted, now)
+
+                def evaluate_all_per_rule() -> None:
+                    for alert in alerts:
+                        per_rule_evaluate(alert.text, alert.posted, now)
+
+                for alert in alerts:
+                    if rule_set.evaluate(alert.text, alert.posted, now) != per_rule_evaluate(
+                        alert.text, alert.posted, now
+                    ):
+                        raise RuntimeError(f"Expiry rules disagree on {alert.text!r}")
+
+                results[size] = {
+                    "alerts": len(alerts),
+                    "page_bytes": len(html.encode()),
+                    "stages": {
+                        "fetch": await time_fetch(session, f"{base_url}/{size}/", iterations),
+                        "unchanged": await time_fetch(
+                            session,
+                            f"{base_url}/{size}/",
+                            iterations,
+                            alert_region_hash(html),
+                        ),
+                        "parse": time_stage(lambda: parse_alerts(html), iterations),
+                        "feed": time_stage(lambda: parse_feed(feed), iterations),
+                        "records": time_stage(lambda: create_alerts(rows), iterations),
+                        "count": time_stage(lambda: count_alerts(alerts), iterations),
+                        "expiry": time_stage(evaluate_all, iterations),
+                        "per_rule": time_stage(evaluate_all_per_rule, iterations),
+                        "snapshot": time_stage(lambda: build_snapshot(result), iterations),
+                        "cluster": time_stage(lambda: index_alerts(alerts), iterations),
+                        "keywords": time_stage(
+                            lambda: KeywordSubscriptions(KEYWORDS).alerts(snapshot, 0),
+                            iterations,
+                        ),
+                        "render": time_stage(render_entities(snapshot), iterations),
+                    },
+                }
+    finally:
+        await runner.cleanup()
+    return results
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> bool:
+    """Print the change in ops/sec against a baseline, return False on regression."""
+    ok = True
+    for size, sized in current["results"].items():
+        base_sized = baseline.get("results", {}).get(size)
+        if base_sized is None:
+            continue
+        for stage, stats in sized["stages"].items():
+            base_stats = base_sized["stages"].get(stage)
+            if not base_stats or not base_stats["ops_per_sec"] or not stats["ops_per_sec"]:
+                continue
+            change = (stats["ops_per_sec"] / base_stats["ops_per_sec"] - 1) * 100
+            regressed = change < -threshold
+            ok = ok and not regressed
+            print(
+                f"{size:>12} {stage:>9} {base_stats['ops_per_sec']:>12.2f} -> "
+                f"{stats['ops_per_sec']:>12.2f} ops/s {change:+7.1f}%"
+                + ("  REGRESSION" if regressed else "")
+            )
+    return ok
+
+
+def print_table(results: dict) -> None:
+    """Print the results as a table."""
+    print(f"{'page':>12} {'stage':>9} {'ops/s':>12} {'p50 ms':>10} {'p99 ms':>10} {'alloc KiB':>10}")
+    for size, sized in results.items():
+        for stage, stats in sized["stages"].items():
+            print(
+                f"{size:>12} {stage:>9} {stats['ops_per_sec']:>12.2f} "
+                f"{stats['p50_ms']:>10.3f} {stats['p99_ms']:>10.3f} {stats['peak_alloc_kib']:>10.1f}"
+            )
+
+
+def main() -> int:
+    """Run the benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", nargs="+", choices=list(PAGE_SIZES), default=list(PAGE_SIZES),
+        help="page sizes to run",
+    )
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="multiply the number of iterations"
+    )
+    parser.add_argument("--output", type=Path, help="write the results as JSON")
+    parser.add_argument("--compare", type=Path, help="compare with saved JSON results")
+    parser.add_argument(
+        "--threshold", type=float, default=10.0,
+        help="ops/sec loss in percent reported as a regression",
+    )
+    args = parser.parse_args()
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": asyncio.run(run(args.sizes, args.scale)),
+        "peak_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+    print_table(report["results"])
+    print(f"peak RSS: {report['peak_rss_kib']} KiB")
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+    if args.compare:
+        if not compare(report, json.loads(args.compare.read_text()), args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""Measure what the Nixle entities of one agency write to the recorder per day.
+
+Polls are simulated for some days on a synthetic agency page whose
+relative timestamps advance and which gains a new alert every few hours.
+After each poll the entities are updated as in Home Assistant and every
+state they write is encoded the way the recorder stores it, for three
+setups:
+
+    every_poll  a state written on every poll, with all attributes
+    gated       states only written when the entity's derived key changed
+    unrecorded  gated, and the _unrecorded_attributes of each entity left out
+
+The recorder stores the attributes of a state once per distinct content,
+so attribute bytes only count each JSON payload the first time it is seen.
+
+Run from the repository root in an environment with Home Assistant:
+
+    python benchmarks/bench_recorder.py --output recorder.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+from datetime import timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from corpus import TYPES, alert_text  # noqa: E402
+
+from custom_components.nixle.binary_sensor import NixleActiveAlertSensor  # noqa: E402
+from custom_components.nixle.clustering import AlertClusterIndex  # noqa: E402
+from custom_components.nixle.expiry import ActiveAlerts  # noqa: E402
+from custom_components.nixle.models import build_snapshot, create_alerts  # noqa: E402
+from custom_components.nixle.nixle_api import count_alerts  # noqa: E402
+from custom_components.nixle.sensor import (  # noqa: E402
+    NixleAlertCountSensor,
+    NixleLatestAlertSensor,
+    NixleTotalAlertsSensor,
+)
+from homeassistant.const import (  # noqa: E402
+    ATTR_ATTRIBUTION,
+    ATTR_RESTORED,
+    ATTR_SUPPORTED_FEATURES,
+)
+from homeassistant.helpers.json import json_bytes  # noqa: E402
+from homeassistant.util import dt as dt_util  # noqa: E402
+
+POLL_INTERVAL = timedelta(minutes=15)
+
+# Alerts on the agency page, and how often a new one is posted
+PAGE_ALERTS = 20
+NEW_ALERT_EVERY = timedelta(hours=4)
+
+SETUPS = ("every_poll", "gated", "unrecorded")
+
+# Attributes the recorder never stores, as in recorder.const, which cannot
+# be imported without the recorder's own requirements
+ALL_DOMAIN_EXCLUDE_ATTRS = frozenset({ATTR_ATTRIBUTION, ATTR_RESTORED, ATTR_SUPPORTED_FEATURES})
+
+
+def relative_timestamp(age: timedelta) -> str:
+    """Return the relative timestamp Nixle shows for an alert of a given age."""
+    if age < timedelta(days=1):
+        return f"Entered: {max(1, age.seconds // 3600)} hours ago"
+    return f"Entered: {age.days} days ago"
+
+
+class Agency:
+    """A synthetic agency page, as it looks at the time of each poll."""
+
+    def __init__(self, start, seed: int) -> None:
+        """Post PAGE_ALERTS alerts over the days before start."""
+        self._rng = random.Random(seed)
+        self._posted = []
+        for index in range(PAGE_ALERTS):
+            self._post(start - NEW_ALERT_EVERY * (3 * index + 1))
+        self._posted.reverse()
+        self._next_post = start + NEW_ALERT_EVERY
+
+    def _post(self, when) -> None:
+        """Add an alert posted at a time."""
+        number = len(self._posted)
+        self._posted.append(
+            (when, self._rng.choice(TYPES), alert_text(self._rng), f"https://nixle.us/R{number:06d}")
+        )
+
+    def rows(self, now) -> list[tuple[str, str, str, str]]:
+        """Return the (type, timestamp, text, link) rows on the page at a time."""
+        while self._next_post <= now:
+            self._post(self._next_post)
+            self._next_post += NEW_ALERT_EVERY
+        return [
+            (alert_type, relative_timestamp(now - posted), text, link)
+            for posted, alert_type, text, link in reversed(self._posted[-PAGE_ALERTS:])
+        ]
+
+
+class RecorderTally:
+    """Rows and bytes the recorder would write for one setup."""
+
+    def __init__(self, unrecorded: bool) -> None:
+        """Initialize the tally."""
+        self._unrecorded = unrecorded
+        self._hashes: set[bytes] = set()
+        self.state_rows = 0
+        self.state_bytes = 0
+        self.attribute_rows = 0
+        self.attribute_bytes = 0
+
+    def record(self, entity) -> None:
+        """Count a state written by an entity."""
+        exclude = set(ALL_DOMAIN_EXCLUDE_ATTRS)
+        if self._unrecorded:
+            exclude |= entity._unrecorded_attributes
+        attributes = {
+            "friendly_name": entity._attr_name,
+            "icon": entity._attr_icon,
+            **(entity.capability_attributes or {}),
+            **(entity.extra_state_attributes or {}),
+        }
+        self.state_rows += 1
+        self.state_bytes += len(str(entity.state).encode())
+        shared = json_bytes({k: v for k, v in attributes.items() if k not in exclude})
+        if shared not in self._hashes:
+            self._hashes.add(shared)
+            self.attribute_rows += 1
+            self.attribute_bytes += len(shared)
+
+    def as_dict(self, days: int) -> dict:
+        """Return the rows and bytes written per day."""
+        return {
+            "state_rows": self.state_rows / days,
+            "state_bytes": self.state_bytes / days,
+            "attribute_rows": self.attribute_rows / days,
+            "attribute_bytes": self.attribute_bytes / days,
+            "total_bytes": (self.state_bytes + self.attribute_bytes) / days,
+        }
+
+
+def create_entities(coordinator) -> list:
+    """Return the entities of an entry that show the agency's alerts."""
+    entry = SimpleNamespace(entry_id="bench", data={"agency_url": "http://bench/"})
+    return [
+        NixleTotalAlertsSensor(coordinator, entry, "Bench", "bench"),
+        *(
+            NixleAlertCountSensor(coordinator, entry, "Bench", "bench", alert_type)
+            for alert_type in ("alert", "advisory", "community")
+        ),
+        NixleLatestAlertSensor(coordinator, entry, "Bench", "bench", []),
+        NixleActiveAlertSensor(coordinator, entry, "Bench", "bench"),
+    ]
+
+
+def simulate(days: int, seed: int) -> dict:
+    """Poll a synthetic agency for a number of days, return the tallies by setup."""
+    start = dt_util.now()
+    agency = Agency(start, seed)
+    index = AlertClusterIndex()
+    active = ActiveAlerts()
+    coordinator = SimpleNamespace(
+        data=None,
+        active=active,
+        scheduler=SimpleNamespace(interval=POLL_INTERVAL),
+        last_update_success=True,
+        data_available=True,
+        stale_since=None,
+        distinct_alerts=lambda alerts, limit=None: index.distinct("bench", alerts, limit),
+    )
+    tallies = {setup: RecorderTally(setup == "unrecorded") for setup in SETUPS}
+    gated = create_entities(coordinator)
+    every_poll = create_entities(coordinator)
+    for entity in gated:
+        entity.async_write_ha_state = lambda entity=entity: (
+            tallies["gated"].record(entity), tallies["unrecorded"].record(entity)
+        )
+
+    now = start
+    while now < start + timedelta(days=days):
+        alerts = create_alerts(agency.rows(now), now)
+        coordinator.data = build_snapshot(
+            {"alerts": alerts, "counts": count_alerts(alerts), "last_updated": now.isoformat()}
+        )
+        index.update("bench", alerts)
+        active.reset(coordinator.data.expiring, now)
+        for entity in gated:
+            entity._handle_coordinator_update()
+        for entity in every_poll:
+            tallies["every_poll"].record(entity)
+        now += POLL_INTERVAL
+    return {setup: tally.as_dict(days) for setup, tally in tallies.items()}
+
+
+def print_table(results: dict) -> None:
+    """Print the results as a table."""
+    print(f"{'setup':>12} {'states':>8} {'state B':>10} {'attr rows':>10} {'attr B':>10} {'total B':>10}")
+    for setup, stats in results.items():
+        print(
+            f"{setup:>12} {stats['state_rows']:>8.0f} {stats['state_bytes']:>10.0f} "
+            f"{stats['attribute_rows']:>10.0f} {stats['attribute_bytes']:>10.0f} "
+            f"{stats['total_bytes']:>10.0f}"
+        )
+
+
+def main() -> int:
+    """Run the simulation from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=7, help="days of polls to simulate")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic alerts")
+    parser.add_argument("--output", type=Path, help="write the results as JSON")
+    args = parser.parse_args()
+
+    report = {"days": args.days, "per_day": simulate(args.days, args.seed)}
+    print(f"recorder writes per day, averaged over {args.days} days")
+    print_table(report["per_day"])
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""Benchmark the startup cost of the Nixle integration.
+
+Every run is a fresh Python process, so module imports are measured cold
+(with bytecode already compiled), as after a Home Assistant restart:
+
+    loop_import    importing the integration package, done on the event loop
+    exec_import    importing the coordinator and parsers, done in the executor
+    warm_up        compiling the expiry rules and warming up the parsers
+    setup          adding a config entry until it is loaded, first fetch included
+    max_stall      longest the event loop was blocked during setup
+
+Pages come from benchmarks/corpus.py and are served by a local aiohttp
+server. Run from the repository root in an environment with Home Assistant:
+
+    python benchmarks/bench_startup.py --output startup.json
+    python benchmarks/bench_startup.py --compare startup.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+METRICS = ("loop_import", "exec_import", "warm_up", "setup", "max_stall")
+
+
+async def _monitor_loop(stalls: list[float]) -> None:
+    """Record how late the event loop wakes up from short sleeps."""
+    interval = 0.001
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        stalls.append(time.perf_counter() - start - interval)
+
+
+async def _run_child() -> dict[str, float]:
+    """Import and set up the integration once, return the timings in ms."""
+    # pylint: disable=import-outside-toplevel
+    from aiohttp import web
+
+    from homeassistant import config_entries, core, loader
+    import homeassistant.components.binary_sensor  # noqa: F401
+    import homeassistant.components.sensor  # noqa: F401
+    from homeassistant.helpers import (
+        area_registry,
+        device_registry,
+        entity,
+        entity_registry,
+        issue_registry,
+    )
+    import homeassistant.helpers.config_validation  # noqa: F401
+    import homeassistant.helpers.update_coordinator  # noqa: F401
+
+    sys.path.insert(0, str(ROOT / "benchmarks"))
+    from corpus import PAGE_SIZES, agency_page
+
+    timings = {}
+    start = time.perf_counter()
+    import custom_components.nixle  # noqa: F401
+
+    timings["loop_import"] = time.perf_counter() - start
+    start = time.perf_counter()
+    import custom_components.nixle.services  # noqa: F401
+
+    timings["exec_import"] = time.perf_counter() - start
+    from custom_components.nixle.warmup import warm_up
+
+    start = time.perf_counter()
+    warm_up()
+    timings["warm_up"] = time.perf_counter() - start
+
+    page = agency_page(PAGE_SIZES["typical"])
+
+    async def handle(request: web.Request) -> web.Response:
+        return web.Response(text=page, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/{agency}/", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        os.symlink(ROOT / "custom_components", Path(config_dir) / "custom_components")
+        hass = core.HomeAssistant(config_dir)
+        hass.config.skip_pip = True
+        hass.config_entries = config_entries.ConfigEntries(hass, {})
+        await hass.config_entries.async_initialize()
+        loader.async_setup(hass)
+        entity.async_setup(hass)
+        for registry in (area_registry, device_registry, entity_registry, issue_registry):
+            await registry.async_load(hass)
+
+        entry = config_entries.ConfigEntry(
+            version=1,
+            minor_version=1,
+            domain="nixle",
+            title="Bench",
+            data={"agency_url": f"http://127.0.0.1:{port}/bench-agency/"},
+            source=config_entries.SOURCE_USER,
+        )
+        stalls: list[float] = []
+        monitor = asyncio.create_task(_monitor_loop(stalls))
+        await asyncio.sleep(0.01)
+        stalls.clear()
+        start = time.perf_counter()
+        await hass.config_entries.async_add(entry)
+        await hass.async_block_till_done()
+        timings["setup"] = time.perf_counter() - start
+        monitor.cancel()
+        timings["max_stall"] = max(stalls, default=0.0)
+        if entry.state is not config_entries.ConfigEntryState.LOADED:
+            raise RuntimeError(f"Entry was not set up: {entry.state}")
+
+        await hass.async_stop(force=True)
+    await runner.cleanup()
+    return {name: round(value * 1000, 3) for name, value in timings.items()}
+
+
+def run(runs: int) -> dict[str, dict[str, float]]:
+    """Run the child benchmark in fresh processes, return the median and max of each metric."""
+    samples: dict[str, list[float]] = {name: [] for name in METRICS}
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, __file__, "--child"],
+            check=True,
+            capture_output=True,
+            text=True,
+            cwd=ROOT,
+        ).stdout
+        for name, value in json.loads(output.splitlines()[-1]).items():
+            samples[name].append(value)
+    return {
+        name: {"median_ms": round(statistics.median(values), 3), "max_ms": max(values)}
+        for name, values in samples.items()
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> bool:
+    """Print the change in median time against a baseline, return False on regression."""
+    ok = True
+    for name, stats in current["results"].items():
+        base_stats = baseline.get("results", {}).get(name)
+        if not base_stats or not base_stats["median_ms"]:
+            continue
+        change = (stats["median_ms"] / base_stats["median_ms"] - 1) * 100
+        regressed = change > threshold
+        ok = ok and not regressed
+        print(
+            f"{name:>12} {base_stats['median_ms']:>10.2f} -> {stats['median_ms']:>10.2f} ms"
+            f" {change:+7.1f}%" + ("  REGRESSION" if regressed else "")
+        )
+    return ok
+
+
+def main() -> int:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="number of fresh processes")
+    parser.add_argument("--output", type=Path, help="write the results as JSON")
+    parser.add_argument("--compare", type=Path, help="compare with saved JSON results")
+    parser.add_argument(
+        "--threshold", type=float, default=20.0,
+        help="increase of a median time in percent reported as a regression",
+    )
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        sys.path.insert(0, str(ROOT))
+        print(json.dumps(asyncio.run(_run_child())))
+        return 0
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": run(args.runs),
+    }
+    print(f"{'metric':>12} {'median ms':>10} {'max ms':>10}")
+    for name, stats in report["results"].items():
+        print(f"{name:>12} {stats['median_ms']:>10.2f} {stats['max_ms']:>10.2f}")
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+    if args.compare:
+        if not compare(report, json.loads(args.compare.read_text()), args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
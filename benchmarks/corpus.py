@@ -0,0 +1,105 @@
+"""Synthetic Nixle agency pages and alert texts for the benchmarks.
+
+The pages follow the markup of local.nixle.com agency pages: a navigation
+list, then a list with one <li> per alert holding the type label, an <h2>
+with the relative timestamp, the alert text and a link to nixle.us.
+Feeds hold the same alerts as RSS 2.0 items.
+"""
+from __future__ import annotations
+
+import random
+from datetime import date, datetime, timedelta, timezone
+from email.utils import format_datetime
+from html import escape
+
+ALERT_TEXTS = (
+    "Snow emergency declared for tonight, {weekday}, {month} {day}. Parking ban in effect from 10pm to 6am.",
+    "The City has declared a snow emergency for {weekday} night, {month} {day}{suffix}. Vehicles parked on the street will be towed.",
+    "Parking ban for {weekday}, {month} {day}, {year}. Please move vehicles off the street before 8pm.",
+    "Boil water notice issued for residents on Elm Street until further notice.",
+    "Road closure on Main Street for water main repairs; detours are posted.",
+    "Community meeting at City Hall regarding summer programs, all residents welcome.",
+    "Leaf collection begins next week in Ward {ward}. Please place bags at the curb.",
+)
+
+TIMESTAMPS = (
+    "Entered: {n} hours ago",
+    "Entered: {n} days ago",
+    "Entered: 1 month, {n} days ago",
+    "Entered: 1 year, {n} months ago",
+)
+
+TYPES = ("Alert", "Advisory", "Community")
+
+# Page sizes used by the benchmarks: name -> number of alerts
+PAGE_SIZES = {
+    "small": 5,
+    "typical": 20,
+    "pathological": 10_000,
+}
+
+
+def alert_text(rng: random.Random) -> str:
+    """Return a random alert text."""
+    day = date.today() + timedelta(days=rng.randint(-60, 3))
+    return rng.choice(ALERT_TEXTS).format(
+        weekday=f"{day:%A}",
+        month=f"{day:%B}",
+        day=day.day,
+        suffix=rng.choice(("", "st", "th")),
+        year=day.year,
+        ward=rng.randint(1, 12),
+    )
+
+
+def alert_corpus(count: int, seed: int = 0) -> list[tuple[str, str, str]]:
+    """Return (type, timestamp, text) tuples."""
+    rng = random.Random(seed)
+    return [
+        (
+            rng.choice(TYPES),
+            rng.choice(TIMESTAMPS).format(n=rng.randint(1, 11)),
+            alert_text(rng),
+        )
+        for _ in range(count)
+    ]
+
+
+def agency_page(count: int, seed: int = 0) -> str:
+    """Return an agency page with the given number of alerts."""
+    items = [
+        "<li class=\"alert\">"
+        f"<div class=\"type\"><span>{alert_type}</span></div>"
+        f"<h2>{timestamp}</h2>"
+        f"<p>{escape(text)}</p>"
+        f"<a href=\"https://nixle.us/B{seed:02d}{index:06d}\">More &raquo;</a>"
+        "</li>"
+        for index, (alert_type, timestamp, text) in enumerate(alert_corpus(count, seed))
+    ]
+    return (
+        "<!DOCTYPE html><html><head><title>Nixle</title>"
+        "<script>window.config = {};</script></head><body>"
+        "<nav><ul><li><a href=\"/\">Home</a></li><li><a href=\"/about\">About</a></li></ul></nav>"
+        "<main><ul class=\"alerts\">"
+        + "".join(items)
+        + "</ul></main><footer><p>Powered by Nixle</p></footer></body></html>"
+    )
+
+
+def agency_feed(count: int, seed: int = 0) -> str:
+    """Return an RSS feed with the same alerts as agency_page."""
+    posted = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    items = [
+        "<item>"
+        f"<title>{alert_type}: {escape(text)}</title>"
+        f"<link>https://nixle.us/B{seed:02d}{index:06d}</link>"
+        f"<pubDate>{format_datetime(posted - timedelta(hours=index))}</pubDate>"
+        "</item>"
+        for index, (alert_type, _, text) in enumerate(alert_corpus(count, seed))
+    ]
+    return (
+        "<?xml version=\"1.0\" encoding=\"UTF-8\"?>"
+        "<rss version=\"2.0\"><channel><title>Nixle</title>"
+        + "".join(items)
+        + "</channel></rss>"
+    )
@@ -1,59 +1,100 @@
 """Nixle integration for Home Assistant."""
+from importlib import import_module
 import logging
-from datetime import timedelta
 from typing import List
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.core import HomeAssistant, callback
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.typing import ConfigType
 
-from .const import DOMAIN
-from .nixle_api import NixleAPI
+from .const import CONF_AGENCY_URL, DOMAIN
+from .entity import AgencyInfo
 
 _LOGGER = logging.getLogger(__name__)
 
 PLATFORMS: List[Platform] = [Platform.SENSOR, Platform.BINARY_SENSOR]
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the Nixle services."""
+    # The services import the coordinator, which pulls in the parsers and
+    # SQLite, so import them off the event loop
+    services = await hass.async_add_executor_job(import_module, f"{__name__}.services")
+    services.async_setup_services(hass)
+    return True
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Nixle from a config entry."""
-    agency_url = entry.data["agency_url"]
-    
-    api = NixleAPI(agency_url, hass)
-    
-    async def async_update_data():
-        """Fetch data from Nixle."""
-        try:
-            return await api.async_get_alerts()
-        except Exception as err:
-            raise UpdateFailed(f"Error communicating with Nixle: {err}") from err
-
-    coordinator = DataUpdateCoordinator(
-        hass,
-        _LOGGER,
-        name=DOMAIN,
-        update_method=async_update_data,
-        update_interval=timedelta(minutes=15),
-    )
-
-    await coordinator.async_config_entry_first_refresh()
+    from .coordinator import get_agency_registry
+
+    # Entries for the same agency share one coordinator and API client
+    coordinator = await get_agency_registry(hass).async_attach(entry)
 
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][entry.entry_id] = {
         "coordinator": coordinator,
-        "api": api,
+        "api": coordinator.api,
+        "agency": AgencyInfo.from_url(entry.data[CONF_AGENCY_URL]),
     }
 
+    await er.async_migrate_entries(hass, entry.entry_id, _unique_id_migration(entry))
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+
     return True
 
 
+def _unique_id_migration(entry: ConfigEntry):
+    """Return a migration of unique ids to ones that include the entry id.
+
+    Unique ids used to be per agency, so a second entry for the same agency
+    could not create its entities.
+    """
+    prefix = f"{entry.entry_id}_"
+
+    @callback
+    def migrate(entity: er.RegistryEntry) -> dict | None:
+        if entity.unique_id.startswith(prefix):
+            return None
+        return {"new_unique_id": f"{prefix}{entity.unique_id}"}
+
+    return migrate
+
+
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the config entry when its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
+        from .coordinator import get_agency_registry
+
         hass.data[DOMAIN].pop(entry.entry_id)
+        await get_agency_registry(hass).async_detach(entry)
 
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Delete the alert cache once no remaining entry monitors the agency."""
+    from .cache import NixleAlertCache
+    from .coordinator import normalize_agency_url
+
+    agency_url = normalize_agency_url(entry.data[CONF_AGENCY_URL])
+    for other in hass.config_entries.async_entries(DOMAIN):
+        if (
+            other.entry_id != entry.entry_id
+            and normalize_agency_url(other.data[CONF_AGENCY_URL]) == agency_url
+        ):
+            return
+    await NixleAlertCache(hass, agency_url).async_remove()
@@ -0,0 +1,191 @@
+"""Date and expiry parsing for Nixle alerts."""
+from __future__ import annotations
+
+import logging
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from homeassistant.util import dt as dt_util
+
+_LOGGER = logging.getLogger(__name__)
+
+# Number of (text, posted time) pairs whose parsed expiry is remembered
+EXPIRY_CACHE_SIZE = 512
+
+# Month name to number mapping
+MONTHS = {
+    "January": 1, "February": 2, "March": 3, "April": 4,
+    "May": 5, "June": 6, "July": 7, "August": 8,
+    "September": 9, "October": 10, "November": 11, "December": 12,
+    "Jan": 1, "Feb": 2, "Mar": 3, "Apr": 4, "Jun": 6,
+    "Jul": 7, "Aug": 8, "Sep": 9, "Oct": 10, "Nov": 11, "Dec": 12,
+}
+
+
+_YEARS_RE = re.compile(r"(\d+)\s+years?")
+_MONTHS_RE = re.compile(r"(\d+)\s+months?")
+_DAYS_RE = re.compile(r"(\d+)\s+days?")
+_HOURS_RE = re.compile(r"(\d+)\s+hours?")
+
+
+@dataclass(frozen=True)
+class ExpiryRule:
+    """A phrase naming the day an alert applies to.
+
+    The pattern must define the named groups "month" and "day", and may
+    define "year". The alert expires expiry_days after that day, at
+    expiry_hour local time.
+    """
+
+    rule_id: str
+    pattern: str
+    expiry_days: int = 1
+    expiry_hour: int = 6
+
+
+# Rules are tried in order; the first rule that matches anywhere wins
+EXPIRY_RULES: tuple[ExpiryRule, ...] = (
+    # "tonight, Day, Month Date, Year" or "tonight, Day, Month Date"
+    ExpiryRule(
+        "tonight",
+        r"tonight,\s+\w+,\s+(?P<month>\w+)\s+(?P<day>\d{1,2})(?:st|nd|rd|th)?"
+        r"(?:,\s+(?P<year>\d{4}))?",
+    ),
+    # "for Saturday night, February 15th" or "... February 15th, 2025"
+    ExpiryRule(
+        "night",
+        r"(?:for|declared)\s+\w+\s+night,\s+(?P<month>\w+)\s+(?P<day>\d{1,2})"
+        r"(?:st|nd|rd|th)?(?:,?\s+(?P<year>\d{4}))?",
+    ),
+    # "for Day, Month Date" (not tonight)
+    ExpiryRule(
+        "day",
+        r"for\s+\w+,\s+(?P<month>\w+)\s+(?P<day>\d{1,2})(?:st|nd|rd|th)?"
+        r"(?:,\s+(?P<year>\d{4}))?",
+    ),
+)
+
+_RULE_FIELD_RE = re.compile(r"\(\?P<(month|day|year)>")
+
+
+class ExpiryRuleSet:
+    """A table of expiry rules compiled into a single regular expression."""
+
+    def __init__(self, rules: tuple[ExpiryRule, ...]) -> None:
+        """Compile the rules into one alternation with per-rule named groups."""
+        self.rules = rules
+        alternatives = []
+        for index, rule in enumerate(rules):
+            pattern = _RULE_FIELD_RE.sub(
+                lambda match, index=index: f"(?P<r{index}_{match.group(1)}>",
+                rule.pattern,
+            )
+            alternatives.append(f"(?P<r{index}>{pattern})")
+        self._regex = re.compile("|".join(alternatives), re.IGNORECASE)
+
+    def match(self, text: str) -> tuple[int, re.Match] | None:
+        """Return the index of the highest priority rule matching the text."""
+        best = None
+        for match in self._regex.finditer(text):
+            # The outer group of each alternative closes last
+            index = int(match.lastgroup[1:])
+            if best is None or index < best[0]:
+                best = (index, match)
+                if index == 0:
+                    break
+        return best
+
+    def evaluate(
+        self, text: str, posted: datetime, now: datetime
+    ) -> tuple[str, datetime] | None:
+        """Return the id of the matching rule and the alert's expiry."""
+        found = self.match(text)
+        if found is None:
+            return None
+        index, match = found
+        rule = self.rules[index]
+
+        month_name = match.group(f"r{index}_month")
+        day = int(match.group(f"r{index}_day"))
+        year = match.group(f"r{index}_year") if f"r{index}_year" in match.re.groupindex else None
+        month = MONTHS.get(month_name)
+
+        # If the year or month are unknown, take them from when it was posted
+        year = int(year) if year else posted.year
+        if month is None:
+            month = posted.month
+
+        try:
+            alert_date = dt_util.as_local(datetime(year, month, day, 0, 0, 0))
+        except ValueError as err:
+            _LOGGER.warning("Invalid date parsed: %s/%s/%s - %s", year, month, day, err)
+            return None
+
+        expiry = alert_date.replace(
+            hour=rule.expiry_hour, minute=0, second=0, microsecond=0
+        ) + timedelta(days=rule.expiry_days)
+        _LOGGER.debug(
+            "Parsed '%s' alert: date=%s, expires=%s, now=%s",
+            rule.rule_id,
+            alert_date.date(),
+            expiry,
+            now,
+        )
+        return rule.rule_id, expiry
+
+
+@lru_cache(maxsize=1)
+def get_expiry_rule_set() -> ExpiryRuleSet:
+    """Return the compiled expiry rules.
+
+    They are compiled on first use rather than on import, so the warm-up
+    can do it off the event loop.
+    """
+    return ExpiryRuleSet(EXPIRY_RULES)
+
+
+def calculate_alert_posted_time(timestamp_text: str, now: datetime | None = None) -> datetime:
+    """Calculate when the alert was posted based on timestamp."""
+    # Feeds give the time the alert was posted as an ISO 8601 timestamp
+    if timestamp_text[:1].isdigit() and (posted := dt_util.parse_datetime(timestamp_text)):
+        return posted
+
+    if now is None:
+        now = dt_util.now()
+
+    # Parse "Entered: X year(s), Y month(s), Z day(s), W hour(s) ago"
+    years_match = _YEARS_RE.search(timestamp_text)
+    months_match = _MONTHS_RE.search(timestamp_text)
+    days_match = _DAYS_RE.search(timestamp_text)
+    hours_match = _HOURS_RE.search(timestamp_text)
+
+    years_ago = int(years_match.group(1)) if years_match else 0
+    months_ago = int(months_match.group(1)) if months_match else 0
+    days_ago = int(days_match.group(1)) if days_match else 0
+    hours_ago = int(hours_match.group(1)) if hours_match else 0
+
+    # Calculate when alert was posted
+    # Approximate: 1 month = 30 days, 1 year = 365 days
+    total_days = (years_ago * 365) + (months_ago * 30) + days_ago
+    alert_posted = now - timedelta(days=total_days, hours=hours_ago)
+
+    return alert_posted
+
+
+@lru_cache(maxsize=EXPIRY_CACHE_SIZE)
+def evaluate_alert(text: str, posted: datetime) -> tuple[str, datetime] | None:
+    """Return the id of the rule matching an alert and the alert's expiry.
+
+    Results are memoized by (text, posted time). The posted time of an
+    alert is anchored when it is first seen, see create_alerts, so each
+    alert is evaluated at most once while it stays on the page.
+    """
+    return get_expiry_rule_set().evaluate(text, posted, dt_util.now())
+
+
+def parse_alert_date(text: str, posted: datetime) -> datetime | None:
+    """Parse the expiry of an alert from its text and posted time."""
+    result = evaluate_alert(text, posted)
+    return result[1] if result is not None else None
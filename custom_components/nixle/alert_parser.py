@@ -0,0 +1,242 @@
+"""Single-pass alert extractor for Nixle agency pages."""
+from __future__ import annotations
+
+import re
+from html.parser import HTMLParser
+
+ALERT_TYPE_NAMES = ("Alert", "Advisory", "Community")
+
+# Strings that are never used as the alert description
+_SKIP_TEXT = "More »"
+
+# Alert descriptions shorter than this are assumed to be labels
+_MIN_TEXT_LENGTH = 21
+
+_LINK_RE = re.compile(r"nixle\.us/")
+
+# Elements that never have content or an end tag
+_VOID_ELEMENTS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "keygen",
+    "link", "menuitem", "meta", "param", "source", "track", "wbr",
+    "basefont", "bgsound", "command", "frame", "image", "isindex",
+    "nextid", "spacer",
+})
+
+_LIST_ELEMENTS = frozenset({"ul", "ol"})
+
+
+class _ListClosed(Exception):
+    """Raised internally to stop parsing once the alert list has ended."""
+
+
+class _ItemCollector:
+    """Accumulates the pieces of a single <li> while it is open."""
+
+    __slots__ = ("slot", "strings", "alert_type", "heading", "heading_depth", "link")
+
+    def __init__(self, slot: int) -> None:
+        """Initialize the collector."""
+        self.slot = slot
+        self.strings: list[str] = []
+        self.alert_type: str | None = None
+        self.heading: list[str] | None = None
+        self.heading_depth: int | None = None
+        self.link: str | None = None
+
+    def to_alert(self) -> tuple[str, str, str, str | None] | None:
+        """Build the alert row, or None if this item is not an alert."""
+        if self.alert_type is None:
+            return None
+
+        alert_type = self.alert_type
+        time_text = "".join(self.heading) if self.heading is not None else "Unknown"
+
+        alert_text = "No description available"
+        for text in self.strings:
+            if (
+                text != alert_type
+                and text != time_text
+                and text != _SKIP_TEXT
+            ):
+                alert_text = text
+                break
+
+        return alert_type, time_text, alert_text, self.link
+
+
+class NixleAlertParser(HTMLParser):
+    """Extract alerts from a Nixle page without building a document tree.
+
+    Every <li> that contains an alert type label becomes a
+    (type, timestamp, text, link) row.
+    Parsing stops at the end tag of the list holding the alerts, so the
+    footer and any scripts after it are never scanned.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the parser."""
+        super().__init__(convert_charrefs=True)
+        self.items_scanned = 0
+        self.done = False
+        # Offset in the text fed just past the end tag of the alert list
+        self.list_end: int | None = None
+        self._fed = 0
+        self._tag_start = 0
+        self._stack: list[str] = []
+        self._open_items: list[_ItemCollector] = []
+        self._results: list[tuple | None] = []
+        self._list_depth: int | None = None
+        # Pieces of the current text node, which is split when fed in chunks
+        self._text: list[str] = []
+
+    @property
+    def alerts(self) -> list[tuple]:
+        """Return the alert rows found so far, in document order."""
+        return [alert for alert in self._results if alert is not None]
+
+    def feed(self, data: str) -> None:
+        """Feed more of the document, ignoring anything after the alert list."""
+        if self.done:
+            return
+        self._fed += len(data)
+        try:
+            super().feed(data)
+        except _ListClosed:
+            self.done = True
+
+    def close(self) -> None:
+        """Flush buffered input and close any items left open."""
+        if not self.done:
+            try:
+                super().close()
+            except _ListClosed:
+                self.done = True
+            self._flush_text()
+        while self._open_items:
+            self._finish_item(self._open_items.pop())
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        """Track open elements and the state of any open <li>."""
+        self._flush_text()
+        if tag in _VOID_ELEMENTS:
+            return
+
+        if tag == "a" and self._open_items:
+            href = next((value for name, value in attrs if name == "href"), None)
+            if href is not None and _LINK_RE.search(href):
+                for item in self._open_items:
+                    if item.link is None:
+                        item.link = href
+
+        self._stack.append(tag)
+
+        if tag == "li":
+            self.items_scanned += 1
+            self._results.append(None)
+            self._open_items.append(_ItemCollector(len(self._results) - 1))
+        elif tag == "h2":
+            depth = len(self._stack)
+            for item in self._open_items:
+                if item.heading is None:
+                    item.heading = []
+                    item.heading_depth = depth
+
+    def handle_startendtag(self, tag: str, attrs: list) -> None:
+        """Handle self-closing tags such as <a/> as empty elements."""
+        self.handle_starttag(tag, attrs)
+        if tag not in _VOID_ELEMENTS:
+            self.handle_endtag(tag)
+
+    def parse_endtag(self, i: int) -> int:
+        """Remember where the end tag being parsed starts in the buffered text."""
+        self._tag_start = i
+        return super().parse_endtag(i)
+
+    def handle_endtag(self, tag: str) -> None:
+        """Close the most recent matching element and anything inside it."""
+        self._flush_text()
+        stack = self._stack
+        try:
+            index = len(stack) - 1 - stack[::-1].index(tag)
+        except ValueError:
+            # Stray end tag, the same as BeautifulSoup ignores it
+            return
+
+        while len(stack) > index:
+            closed = stack.pop()
+            depth = len(stack) + 1
+            for item in self._open_items:
+                if item.heading_depth == depth:
+                    item.heading_depth = -1
+            if closed == "li":
+                item = self._open_items.pop()
+                self._finish_item(item)
+                if (
+                    not self._open_items
+                    and self._list_depth is None
+                    and self._results[item.slot] is not None
+                    and stack
+                    and stack[-1] in _LIST_ELEMENTS
+                ):
+                    self._list_depth = len(stack)
+            elif self._list_depth == depth and closed in _LIST_ELEMENTS:
+                if closed == tag:
+                    # The buffered text ends with everything fed so far
+                    end = self.rawdata.find(">", self._tag_start) + 1
+                    self.list_end = self._fed - len(self.rawdata) + end
+                    raise _ListClosed
+                # Closed by a stray outer end tag, so more items may follow,
+                # which BeautifulSoup still finds
+                self._list_depth = None
+
+    def handle_data(self, data: str) -> None:
+        """Collect text for the open items until the text node ends."""
+        if self._open_items:
+            self._text.append(data)
+
+    def handle_comment(self, data: str) -> None:
+        """Comments count as strings for matching, but not as heading text."""
+        self._flush_text()
+        if self._open_items:
+            self._add_string(data, False)
+
+    def handle_decl(self, decl: str) -> None:
+        """End the current text node."""
+        self._flush_text()
+
+    handle_pi = unknown_decl = handle_decl
+
+    def _flush_text(self) -> None:
+        """Feed the text node read so far to every open item."""
+        if self._text:
+            text = "".join(self._text)
+            self._text.clear()
+            self._add_string(text, True)
+
+    def _add_string(self, data: str, visible: bool) -> None:
+        """Record a string for every open item."""
+        text = data.strip()
+        for item in self._open_items:
+            if visible and item.heading_depth is not None and item.heading_depth > 0:
+                item.heading.append(text)
+            if not text:
+                continue
+            if item.alert_type is None and text in ALERT_TYPE_NAMES:
+                item.alert_type = text
+            if len(text) >= _MIN_TEXT_LENGTH:
+                item.strings.append(text)
+
+    def _finish_item(self, item: _ItemCollector) -> None:
+        """Store the record for an item that has just been closed."""
+        self._results[item.slot] = item.to_alert()
+
+
+def parse_alerts(html: str) -> list[tuple]:
+    """Parse the (type, timestamp, text, link) rows of a Nixle agency page.
+
+    This is CPU bound and must not be called from the event loop.
+    """
+    parser = NixleAlertParser()
+    parser.feed(html)
+    parser.close()
+    return parser.alerts
@@ -0,0 +1,124 @@
+"""Persistent cache of the last alerts read for an agency."""
+from __future__ import annotations
+
+import logging
+from typing import Any, Callable
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+from homeassistant.util import slugify
+
+from .const import DOMAIN
+from .models import Alert, AlertSnapshot, AlertType
+from .nixle_api import count_alerts
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+
+# Bumped whenever the layout of the stored data changes. Caches written in
+# another format are ignored and rebuilt by the next refresh.
+CACHE_FORMAT = 1
+
+# Upper bound on the number of alerts written to disk for one agency
+MAX_CACHED_ALERTS = 200
+
+# Coalesce writes of refreshes that happen close together
+SAVE_DELAY = 10
+
+
+class NixleAlertCache:
+    """Store the last snapshot of an agency so it can be shown at startup."""
+
+    def __init__(self, hass: HomeAssistant, agency_url: str) -> None:
+        """Initialize the cache."""
+        self.agency_url = agency_url
+        self._store: Store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{slugify(agency_url)}")
+
+    async def async_load(self) -> tuple[dict, dict] | None:
+        """Return the cached API result and HTTP validators."""
+        try:
+            data = await self._store.async_load()
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.warning("Ignoring unreadable Nixle cache for %s: %s", self.agency_url, err)
+            return None
+
+        if (
+            not data
+            or data.get("format") != CACHE_FORMAT
+            or data.get("agency_url") != self.agency_url
+        ):
+            return None
+
+        alerts = [
+            # Posted times, expiries and fingerprints are stored, so
+            # restoring does not evaluate the texts again, and the posted
+            # times stay anchored to when the alerts were first seen
+            Alert(
+                type=AlertType(alert_type),
+                timestamp=timestamp,
+                text=text,
+                link=link,
+                id=alert_id,
+                posted=dt_util.parse_datetime(posted),
+                fingerprint=fingerprint,
+                expiry=dt_util.parse_datetime(expiry) if expiry else None,
+                full_text=full_text,
+            )
+            for (
+                alert_type,
+                timestamp,
+                text,
+                link,
+                alert_id,
+                posted,
+                fingerprint,
+                expiry,
+                full_text,
+            ) in data["alerts"]
+        ]
+
+        result = {
+            "alerts": alerts,
+            # Counted again, the saved alerts may be fewer than were read
+            "counts": count_alerts(alerts),
+            "last_updated": data["last_updated"],
+        }
+        return result, data["validators"]
+
+    def async_schedule_save(self, data_func: Callable[[], dict[str, Any]]) -> None:
+        """Save the data returned by data_func after a short delay."""
+        self._store.async_delay_save(data_func, SAVE_DELAY)
+
+    def serialize(self, snapshot: AlertSnapshot, validators: dict) -> dict[str, Any]:
+        """Return the compact, size-bounded form of a snapshot.
+
+        The validators are left out when not every alert fits, so that the
+        first poll after a restart reads the alerts that were dropped.
+        """
+        alerts = [
+            [
+                alert.type.value,
+                alert.timestamp,
+                alert.text,
+                alert.link,
+                alert.id,
+                alert.posted.isoformat(),
+                alert.fingerprint,
+                alert.expiry.isoformat() if alert.expiry else None,
+                alert.full_text,
+            ]
+            for alert in snapshot.alerts[:MAX_CACHED_ALERTS]
+        ]
+        return {
+            "format": CACHE_FORMAT,
+            "agency_url": self.agency_url,
+            "last_updated": snapshot.last_updated,
+            "validators": validators if len(snapshot.alerts) <= MAX_CACHED_ALERTS else {},
+            "alerts": alerts,
+        }
+
+    async def async_remove(self) -> None:
+        """Delete the cache file."""
+        await self._store.async_remove()
@@ -0,0 +1,93 @@
+"""Circuit breaker stopping requests to Nixle while it keeps failing."""
+from __future__ import annotations
+
+import time
+from enum import StrEnum
+
+# Consecutive failed requests that open the circuit
+FAILURE_THRESHOLD = 3
+
+# How long the circuit stays open, doubled after each failed probe
+COOL_DOWN = 120.0
+MAX_COOL_DOWN = 3600.0
+
+
+class CircuitState(StrEnum):
+    """State of a circuit breaker."""
+
+    # Requests are made
+    CLOSED = "closed"
+    # No request is made until the cool-down is over
+    OPEN = "open"
+    # A single probe request decides whether to close or open again
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Fail fast instead of waiting on a server that keeps failing.
+
+    After FAILURE_THRESHOLD consecutive failures the circuit opens and
+    requests are refused until the cool-down is over. The next request is
+    then let through as a probe: if it succeeds the circuit closes, if it
+    fails the circuit opens again for twice as long, up to MAX_COOL_DOWN.
+    """
+
+    def __init__(self) -> None:
+        """Initialize a closed circuit."""
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.cool_down = COOL_DOWN
+        self._open_until = 0.0
+        self._probing = False
+
+    @property
+    def retry_after(self) -> float:
+        """Return the seconds left until a probe is allowed."""
+        return max(0.0, self._open_until - time.monotonic())
+
+    def allow_request(self) -> bool:
+        """Return True if a request may be made now."""
+        if self.state is CircuitState.OPEN and not self.retry_after:
+            self.state = CircuitState.HALF_OPEN
+        if self.state is CircuitState.HALF_OPEN:
+            # Only one probe at a time
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+        return self.state is CircuitState.CLOSED
+
+    def record_success(self) -> None:
+        """Close the circuit after a successful request."""
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.cool_down = COOL_DOWN
+        self._probing = False
+
+    def record_failure(self, retry_after: float | None = None) -> None:
+        """Count a failed request, opening the circuit if needed.
+
+        A Retry-After delay from the server opens the circuit right away,
+        and is used as the cool-down when it is longer.
+        """
+        self.failures += 1
+        if self.state is CircuitState.HALF_OPEN:
+            self.cool_down = min(self.cool_down * 2, MAX_COOL_DOWN)
+        elif self.failures < FAILURE_THRESHOLD and retry_after is None:
+            return
+        self.state = CircuitState.OPEN
+        self._probing = False
+        self._open_until = time.monotonic() + max(self.cool_down, retry_after or 0.0)
+
+    def release(self) -> None:
+        """Allow another probe after one was cancelled before it finished."""
+        self._probing = False
+
+    def as_dict(self) -> dict:
+        """Return the state of the circuit for diagnostics."""
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "cool_down": self.cool_down,
+            "retry_after": round(self.retry_after, 1),
+        }
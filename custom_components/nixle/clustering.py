@@ -0,0 +1,233 @@
+"""Near-duplicate clustering of alerts reposted by several agencies."""
+from __future__ import annotations
+
+import hashlib
+import re
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .models import Alert, AlertType
+
+# Fingerprints at most this many bits apart are the same alert
+MAX_DISTANCE = 3
+
+# Fingerprints are split in MAX_DISTANCE + 1 bands, so two close enough
+# fingerprints are always equal in at least one band
+BANDS = MAX_DISTANCE + 1
+BAND_BITS = 64 // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+# Words per shingle
+SHINGLE_SIZE = 3
+
+_WORD_RE = re.compile(r"[^\W_]+")
+
+_NUMBER_RE = re.compile(r"\d+")
+
+# Bits of a fingerprint are counted in 16 bit lanes of one integer
+_LANE_BITS = 16
+
+
+@lru_cache(maxsize=1)
+def _spread_table() -> tuple[int, ...]:
+    """Map each byte value to its 8 bits spread out to the lowest bit of 8 lanes."""
+    return tuple(
+        sum(((value >> bit) & 1) << (bit * _LANE_BITS) for bit in range(8))
+        for value in range(256)
+    )
+
+
+@lru_cache(maxsize=4096)
+def simhash(text: str) -> int:
+    """Return the 64 bit simhash of an alert text.
+
+    The text is lowercased and split into words, and every run of
+    SHINGLE_SIZE words votes for the bits of its hash. Texts that differ in
+    case, punctuation or spacing get the same fingerprint, and texts with
+    small edits get fingerprints a few bits apart.
+    """
+    words = _WORD_RE.findall(text.lower())
+    shingles = [
+        " ".join(words[i : i + SHINGLE_SIZE])
+        for i in range(max(1, len(words) - SHINGLE_SIZE + 1))
+    ]
+    # Add up the bits of every shingle hash, all 64 lanes at once
+    spread = _spread_table()
+    total = 0
+    for shingle in shingles:
+        digest = hashlib.blake2b(shingle.encode(), digest_size=8).digest()
+        for index, value in enumerate(digest):
+            total += spread[value] << (index * 8 * _LANE_BITS)
+    counts = memoryview(total.to_bytes(64 * _LANE_BITS // 8, "little")).cast("H")
+    return sum(1 << bit for bit, count in enumerate(counts) if count * 2 > len(shingles))
+
+
+def alert_signature(alert: Alert) -> tuple:
+    """Return what every copy of an alert has in common besides its fingerprint.
+
+    Alerts posted from one template that only differ in a date are a few
+    bits apart, so copies must also have the same type, numbers and expiry.
+    """
+    return alert.type, alert.expiry, tuple(_NUMBER_RE.findall(alert.text))
+
+
+def _bands(signature: tuple, fingerprint: int) -> list[tuple]:
+    """Return the bucket keys of a fingerprint."""
+    return [
+        (signature, band, (fingerprint >> (band * BAND_BITS)) & BAND_MASK)
+        for band in range(BANDS)
+    ]
+
+
+@dataclass(slots=True)
+class AlertCluster:
+    """Alerts of one or more agencies that are copies of the same alert."""
+
+    type: AlertType
+    # Fingerprint and signature of the alert that started the cluster
+    fingerprint: int
+    signature: tuple
+    # Member alerts by (agency URL, alert id)
+    members: dict[tuple[str, str], Alert] = field(default_factory=dict)
+
+    @property
+    def canonical(self) -> Alert:
+        """Return the alert posted first."""
+        return min(self.members.values(), key=lambda alert: alert.posted)
+
+    @property
+    def id(self) -> str:
+        """Return the id of the canonical alert."""
+        return self.canonical.id
+
+    @property
+    def sources(self) -> tuple[str, ...]:
+        """Return the URLs of the agencies that posted the alert."""
+        return tuple(sorted({agency_url for agency_url, _ in self.members}))
+
+    def attributes(self) -> dict:
+        """Return the canonical alert and its sources as state attributes."""
+        canonical = self.canonical
+        return {
+            "cluster_id": canonical.id,
+            "canonical_link": canonical.link,
+            "sources": list(self.sources),
+        }
+
+
+class AlertClusterIndex:
+    """Group the alerts of all agencies into clusters of near-duplicates.
+
+    Fingerprints are bucketed by signature and band, so adding an alert
+    only compares it with the clusters sharing one of its bands. on_change is called with
+    the URLs of the other agencies whose clusters gained or lost a source.
+    """
+
+    def __init__(self, on_change: Callable[[set[str]], None] | None = None) -> None:
+        """Initialize the index."""
+        self._on_change = on_change
+        self._clusters: dict[int, AlertCluster] = {}
+        self._buckets: dict[tuple, set[int]] = {}
+        # Cluster number of every alert, by agency URL and alert id
+        self._members: dict[str, dict[str, int]] = {}
+        self._next_number = 0
+
+    def update(self, agency_url: str, alerts: Iterable[Alert]) -> None:
+        """Replace the alerts of an agency."""
+        members = self._members.setdefault(agency_url, {})
+        current = {alert.id: alert for alert in alerts}
+        sources_before: dict[int, tuple[str, ...]] = {}
+
+        for alert_id in members.keys() - current.keys():
+            number = members.pop(alert_id)
+            cluster = self._clusters[number]
+            sources_before.setdefault(number, cluster.sources)
+            del cluster.members[(agency_url, alert_id)]
+            if not cluster.members:
+                self._remove_cluster(number)
+
+        for alert_id, alert in current.items():
+            if (number := members.get(alert_id)) is None:
+                number = members[alert_id] = self._find_cluster(alert)
+                sources_before.setdefault(number, self._clusters[number].sources)
+            # The relative timestamp of a kept alert changes over time
+            self._clusters[number].members[(agency_url, alert_id)] = alert
+
+        if not members:
+            del self._members[agency_url]
+        self._notify(agency_url, sources_before)
+
+    def remove(self, agency_url: str) -> None:
+        """Forget every alert of an agency."""
+        self.update(agency_url, ())
+
+    def distinct(
+        self, agency_url: str, alerts: Iterable[Alert], limit: int | None = None
+    ) -> list[tuple[Alert, AlertCluster | None]]:
+        """Return the first alert of each cluster, with its cluster.
+
+        Alerts that are not in the index are kept, with no cluster.
+        """
+        members = self._members.get(agency_url, {})
+        seen: set[int] = set()
+        distinct = []
+        for alert in alerts:
+            if limit is not None and len(distinct) >= limit:
+                break
+            if (number := members.get(alert.id)) is not None:
+                if number in seen:
+                    continue
+                seen.add(number)
+            distinct.append((alert, self._clusters.get(number)))
+        return distinct
+
+    def shared(self, agency_url: str) -> list[AlertCluster]:
+        """Return the clusters of an agency that other agencies also posted."""
+        numbers = dict.fromkeys(self._members.get(agency_url, {}).values())
+        return [
+            cluster
+            for number in numbers
+            if len((cluster := self._clusters[number]).sources) > 1
+        ]
+
+    def _find_cluster(self, alert: Alert) -> int:
+        """Return the number of the cluster an alert belongs to, creating one if needed."""
+        signature = alert_signature(alert)
+        bands = _bands(signature, alert.fingerprint)
+        for key in bands:
+            for number in self._buckets.get(key, ()):
+                if (self._clusters[number].fingerprint ^ alert.fingerprint).bit_count() <= MAX_DISTANCE:
+                    return number
+
+        number = self._next_number
+        self._next_number += 1
+        self._clusters[number] = AlertCluster(alert.type, alert.fingerprint, signature)
+        for key in bands:
+            self._buckets.setdefault(key, set()).add(number)
+        return number
+
+    def _remove_cluster(self, number: int) -> None:
+        """Delete an empty cluster."""
+        cluster = self._clusters.pop(number)
+        for key in _bands(cluster.signature, cluster.fingerprint):
+            bucket = self._buckets[key]
+            bucket.discard(number)
+            if not bucket:
+                del self._buckets[key]
+
+    def _notify(self, agency_url: str, sources_before: dict[int, tuple[str, ...]]) -> None:
+        """Call on_change for the other agencies of clusters whose sources changed."""
+        if self._on_change is None:
+            return
+        changed: set[str] = set()
+        for number, before in sources_before.items():
+            cluster = self._clusters.get(number)
+            after = cluster.sources if cluster is not None else ()
+            if before != after:
+                changed.update(before, after)
+        changed.discard(agency_url)
+        if changed:
+            self._on_change(changed)
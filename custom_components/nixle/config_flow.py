@@ -2,12 +2,37 @@
 from __future__ import annotations
 
 import logging
+import os
 from typing import Any
 
 import voluptuous as vol
 
 from homeassistant import config_entries
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
+from homeassistant.helpers.selector import TextSelector, TextSelectorConfig
+
+from .const import (
+    CONF_FEED_URL,
+    CONF_FETCH_DETAILS,
+    CONF_HISTORY_DAYS,
+    CONF_HISTORY_RETENTION,
+    CONF_KEYWORDS,
+    CONF_MAX_INTERVAL,
+    CONF_MAX_PAGE_SIZE,
+    CONF_MAX_PAGES,
+    CONF_MIN_INTERVAL,
+    CONF_PAGE_CONCURRENCY,
+    CONF_TRACE_POLLS,
+    DEFAULT_HISTORY_DAYS,
+    DEFAULT_HISTORY_RETENTION,
+    DEFAULT_MAX_INTERVAL,
+    DEFAULT_MAX_PAGE_SIZE,
+    DEFAULT_MAX_PAGES,
+    DEFAULT_MIN_INTERVAL,
+    DEFAULT_PAGE_CONCURRENCY,
+)
+from .keywords import keyword_slug, keyword_words
 
 DOMAIN = "nixle"
 
@@ -19,6 +44,14 @@ class NixleConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> NixleOptionsFlow:
+        """Get the options flow for this handler."""
+        return NixleOptionsFlow(config_entry)
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
@@ -35,3 +68,102 @@ class NixleConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 vol.Required("agency_url", default="https://local.nixle.com/"): str,
             }),
         )
+
+
+class NixleOptionsFlow(config_entries.OptionsFlow):
+    """Handle Nixle options."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize the options flow."""
+        self._config_entry = config_entry
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage the options."""
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            feed_url = user_input.get(CONF_FEED_URL, "").strip()
+            # One subscription per sensor, ignoring blank lines and phrases
+            # that only differ in case, accents or punctuation
+            keywords: dict[str, str] = {}
+            for keyword in user_input.get(CONF_KEYWORDS, []):
+                if keyword := " ".join(keyword.split()):
+                    key = keyword_slug(keyword) if keyword_words(keyword) else ""
+                    keywords.setdefault(key, keyword)
+            # Local files must be in allowlist_external_dirs, which is
+            # checked on disk
+            feed_allowed = (
+                not feed_url
+                or feed_url.startswith(("http://", "https://"))
+                or (
+                    os.path.isabs(feed_url)
+                    and await self.hass.async_add_executor_job(
+                        self.hass.config.is_allowed_path, feed_url
+                    )
+                )
+            )
+            if user_input[CONF_MIN_INTERVAL] > user_input[CONF_MAX_INTERVAL]:
+                errors["base"] = "invalid_interval"
+            elif not feed_allowed:
+                errors[CONF_FEED_URL] = "feed_not_allowed"
+            elif "" in keywords:
+                errors[CONF_KEYWORDS] = "invalid_keyword"
+            else:
+                user_input[CONF_KEYWORDS] = list(keywords.values())
+                user_input.pop(CONF_FEED_URL, None)
+                if feed_url:
+                    user_input[CONF_FEED_URL] = feed_url
+                return self.async_create_entry(title="", data=user_input)
+
+        options = self._config_entry.options
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema({
+                vol.Optional(
+                    CONF_MAX_PAGES,
+                    default=options.get(CONF_MAX_PAGES, DEFAULT_MAX_PAGES),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=20)),
+                vol.Optional(
+                    CONF_PAGE_CONCURRENCY,
+                    default=options.get(CONF_PAGE_CONCURRENCY, DEFAULT_PAGE_CONCURRENCY),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=10)),
+                vol.Optional(
+                    CONF_HISTORY_DAYS,
+                    default=options.get(CONF_HISTORY_DAYS, DEFAULT_HISTORY_DAYS),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=365)),
+                vol.Optional(
+                    CONF_HISTORY_RETENTION,
+                    default=options.get(CONF_HISTORY_RETENTION, DEFAULT_HISTORY_RETENTION),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=3650)),
+                vol.Optional(
+                    CONF_MIN_INTERVAL,
+                    default=options.get(CONF_MIN_INTERVAL, DEFAULT_MIN_INTERVAL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=1440)),
+                vol.Optional(
+                    CONF_MAX_INTERVAL,
+                    default=options.get(CONF_MAX_INTERVAL, DEFAULT_MAX_INTERVAL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=1440)),
+                vol.Optional(
+                    CONF_MAX_PAGE_SIZE,
+                    default=options.get(CONF_MAX_PAGE_SIZE, DEFAULT_MAX_PAGE_SIZE),
+                ): vol.All(vol.Coerce(int), vol.Range(min=64, max=16384)),
+                vol.Optional(
+                    CONF_FEED_URL,
+                    description={"suggested_value": options.get(CONF_FEED_URL)},
+                ): str,
+                vol.Optional(
+                    CONF_KEYWORDS,
+                    default=options.get(CONF_KEYWORDS, []),
+                ): TextSelector(TextSelectorConfig(multiple=True)),
+                vol.Optional(
+                    CONF_FETCH_DETAILS,
+                    default=options.get(CONF_FETCH_DETAILS, False),
+                ): bool,
+                vol.Optional(
+                    CONF_TRACE_POLLS,
+                    default=options.get(CONF_TRACE_POLLS, False),
+                ): bool,
+            }),
+            errors=errors,
+        )
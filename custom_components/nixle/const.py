@@ -2,6 +2,9 @@
 
 DOMAIN = "nixle"
 
+# Key in hass.data for the registry of agencies shared by config entries
+DATA_AGENCIES = f"{DOMAIN}_agencies"
+
 # Alert types available in Nixle
 ALERT_TYPES = {
     "Alert": "alert",
@@ -12,3 +15,36 @@ ALERT_TYPES = {
 # Configuration keys
 CONF_AGENCY_URL = "agency_url"
 CONF_ALERT_TYPES = "alert_types"
+CONF_MAX_PAGES = "max_pages"
+CONF_PAGE_CONCURRENCY = "page_concurrency"
+CONF_HISTORY_DAYS = "history_days"
+CONF_MIN_INTERVAL = "min_interval"
+CONF_MAX_INTERVAL = "max_interval"
+CONF_TRACE_POLLS = "trace_polls"
+CONF_MAX_PAGE_SIZE = "max_page_size"
+CONF_HISTORY_RETENTION = "history_retention"
+CONF_FEED_URL = "feed_url"
+CONF_FETCH_DETAILS = "fetch_details"
+CONF_KEYWORDS = "keywords"
+
+# Paginated fetching, by default only the first page is read
+DEFAULT_MAX_PAGES = 1
+DEFAULT_PAGE_CONCURRENCY = 3
+DEFAULT_HISTORY_DAYS = 30
+
+# Pages are only read up to this size, in KiB
+DEFAULT_MAX_PAGE_SIZE = 2048
+
+# Alerts are kept in the searchable history for this many days
+DEFAULT_HISTORY_RETENTION = 365
+
+# Bounds of the adaptive polling interval, in minutes
+DEFAULT_MIN_INTERVAL = 5
+DEFAULT_MAX_INTERVAL = 60
+
+# Services
+SERVICE_SEARCH_ALERTS = "search_alerts"
+SERVICE_GET_ALERTS = "get_alerts"
+
+# Event fired for every alert that was not on the page at the previous refresh
+EVENT_NEW_ALERT = f"{DOMAIN}_new_alert"
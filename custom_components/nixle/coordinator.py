@@ -0,0 +1,570 @@
+"""Data update coordinator for the Nixle integration."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Mapping
+from urllib.parse import urlsplit, urlunsplit
+
+import aiohttp
+from aiohttp.hdrs import USER_AGENT
+
+from homeassistant import config_entries
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.helpers.aiohttp_client import SERVER_SOFTWARE
+from homeassistant.helpers.event import (
+    async_call_later,
+    async_track_point_in_time,
+    async_track_time_interval,
+)
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
+from homeassistant.util import ssl as ssl_util
+
+from .const import (
+    CONF_AGENCY_URL,
+    CONF_FEED_URL,
+    CONF_FETCH_DETAILS,
+    CONF_HISTORY_DAYS,
+    CONF_HISTORY_RETENTION,
+    CONF_MAX_INTERVAL,
+    CONF_MAX_PAGE_SIZE,
+    CONF_MAX_PAGES,
+    CONF_MIN_INTERVAL,
+    CONF_PAGE_CONCURRENCY,
+    CONF_TRACE_POLLS,
+    DATA_AGENCIES,
+    DEFAULT_HISTORY_DAYS,
+    DEFAULT_HISTORY_RETENTION,
+    DEFAULT_MAX_INTERVAL,
+    DEFAULT_MAX_PAGE_SIZE,
+    DEFAULT_MAX_PAGES,
+    DEFAULT_MIN_INTERVAL,
+    DEFAULT_PAGE_CONCURRENCY,
+    DOMAIN,
+    EVENT_NEW_ALERT,
+)
+from .cache import NixleAlertCache
+from .circuit import CircuitState
+from .clustering import AlertCluster, AlertClusterIndex
+from .details import NixleDetailFetcher
+from .expiry import ActiveAlerts
+from .history import HISTORY_FILE, NixleAlertHistory
+from .instrumentation import create_trace_config
+from .models import Alert, AlertDiff, AlertSnapshot, build_snapshot
+from .nixle_api import NixleAPI, NixleCircuitOpenError, NixleRateLimitError
+from .scheduler import PollScheduler
+from .sources import create_source
+from .warmup import warm_up
+
+_LOGGER = logging.getLogger(__name__)
+
+UPDATE_INTERVAL = timedelta(minutes=15)
+
+# Requests in flight at the same time, across all agencies
+MAX_CONCURRENT_FETCHES = 4
+
+# Parser steps run in the executor at the same time, across all agencies
+MAX_CONCURRENT_PARSES = 2
+
+# Connection pool shared by all agencies, which all live on local.nixle.com.
+# Idle connections are kept long enough to be reused by staggered polls.
+CONNECTIONS_PER_HOST = 4
+KEEPALIVE_TIMEOUT = 120
+
+# How long the last good alerts are still shown while polls fail
+MAX_STALE_AGE = timedelta(hours=24)
+
+# Old alerts are removed from the history this long after startup, then daily
+HISTORY_COMPACT_DELAY = timedelta(minutes=5)
+HISTORY_COMPACT_INTERVAL = timedelta(days=1)
+
+
+def normalize_agency_url(agency_url: str) -> str:
+    """Return a canonical form of an agency URL for use as a registry key."""
+    parts = urlsplit(agency_url.strip())
+    return urlunsplit(
+        (parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), "", "")
+    )
+
+
+class NixleDataUpdateCoordinator(DataUpdateCoordinator):
+    """Coordinator polling a single Nixle agency page."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        api: NixleAPI,
+        clusters: AlertClusterIndex | None = None,
+        history: NixleAlertHistory | None = None,
+    ) -> None:
+        """Initialize the coordinator."""
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN} {api.agency_url}",
+            update_interval=UPDATE_INTERVAL,
+            # The API returns the previous result when the page is unchanged,
+            # so skip notifying entities when nothing changed
+            always_update=False,
+        )
+        self.api = api
+        self.cache = NixleAlertCache(hass, api.agency_url)
+        self._last_result: dict | None = None
+        self._init_lock = asyncio.Lock()
+        self.last_diff: AlertDiff | None = None
+        # Shared with the other agencies to find the alerts they repost
+        self.clusters = clusters if clusters is not None else AlertClusterIndex()
+        self.history = history
+        # Active alerts are dropped when they expire, not on the next poll
+        self.active = ActiveAlerts()
+        self._unsub_expiry: CALLBACK_TYPE | None = None
+        # When the data was last confirmed by a successful poll
+        self.last_success: datetime | None = None
+        self.scheduler = PollScheduler(
+            timedelta(minutes=DEFAULT_MIN_INTERVAL),
+            timedelta(minutes=DEFAULT_MAX_INTERVAL),
+            UPDATE_INTERVAL,
+        )
+
+    def distinct_alerts(
+        self, alerts, limit: int | None = None
+    ) -> list[tuple[Alert, AlertCluster | None]]:
+        """Return alerts without near-duplicates, each with its cluster."""
+        return self.clusters.distinct(self.api.agency_url, alerts, limit)
+
+    @property
+    def stale_since(self) -> datetime | None:
+        """Return when the data shown was last confirmed, if the last poll failed."""
+        if self.last_update_success or self.data is None:
+            return None
+        return self.last_success
+
+    @property
+    def data_available(self) -> bool:
+        """Return True if there is data to show.
+
+        The last good data is still shown while polls fail, for up to
+        MAX_STALE_AGE after it was last confirmed.
+        """
+        if self.data is None:
+            return False
+        if self.last_update_success:
+            return True
+        return (
+            self.last_success is not None
+            and dt_util.utcnow() - self.last_success < MAX_STALE_AGE
+        )
+
+    def set_interval_bounds(self, min_interval: timedelta, max_interval: timedelta) -> None:
+        """Change the bounds of the adaptive polling interval."""
+        self.scheduler.set_bounds(min_interval, max_interval)
+        self.update_interval = self.scheduler.interval
+
+    async def async_initialize(self) -> None:
+        """Load the first data, from the cache if possible.
+
+        When a cached snapshot exists it is used right away and the first
+        live refresh runs in the background, so entry setup does not wait
+        on Nixle. Otherwise this waits for a live refresh.
+        """
+        async with self._init_lock:
+            if self.data is not None:
+                return
+            if await self._async_restore():
+                self.hass.async_create_background_task(
+                    self.async_refresh(), f"nixle first refresh {self.api.agency_url}"
+                )
+                return
+            await self.async_refresh()
+
+    async def _async_restore(self) -> bool:
+        """Restore the snapshot saved by a previous run, if any."""
+        if (cached := await self.cache.async_load()) is None:
+            return False
+        result, validators = cached
+        self.api.restore(result, validators)
+        self._last_result = result
+        # The cache is saved when the alerts change, so they were
+        # confirmed at least when they were last updated
+        if last_updated := dt_util.parse_datetime(result["last_updated"] or ""):
+            self.last_success = dt_util.as_utc(last_updated)
+        snapshot = build_snapshot(result)
+        self.clusters.update(self.api.agency_url, snapshot.alerts)
+        self._async_track_expiries(snapshot)
+        self.async_set_updated_data(snapshot)
+        _LOGGER.debug(
+            "Restored %s cached Nixle alerts for %s",
+            len(result["alerts"]),
+            self.api.agency_url,
+        )
+        return True
+
+    async def _async_refresh(self, *args: Any, **kwargs: Any) -> None:
+        """Refresh data, also notifying entities if only the interval changed."""
+        interval = self.scheduler.interval
+        await super()._async_refresh(*args, **kwargs)
+        # always_update=False skips listeners when the data is unchanged,
+        # but the interval is shown as an attribute, every poll updates
+        # the diagnostic sensors and stale data expires after failed polls
+        if (
+            self.api.tracing
+            or not self.last_update_success
+            or self.scheduler.interval != interval
+        ):
+            self.async_update_listeners()
+
+    async def _async_update_data(self) -> AlertSnapshot:
+        """Fetch data from Nixle, index it and pick the next interval."""
+        try:
+            result = await self.api.async_get_alerts()
+        except NixleRateLimitError as err:
+            self.update_interval = self.scheduler.failure_interval(err.retry_after)
+            raise UpdateFailed(f"Rate limited by Nixle: {err}") from err
+        except NixleCircuitOpenError as err:
+            # Poll again when the circuit lets a probe through
+            self.update_interval = self.scheduler.probe_interval(err.retry_after)
+            raise UpdateFailed(str(err)) from err
+        except Exception as err:
+            if self.api.circuit.state is CircuitState.OPEN:
+                # This failure opened the circuit, probe after its cool-down
+                self.update_interval = self.scheduler.probe_interval(
+                    self.api.circuit.retry_after
+                )
+            else:
+                self.update_interval = self.scheduler.failure_interval()
+            raise UpdateFailed(f"Error communicating with Nixle: {err}") from err
+
+        now = dt_util.now()
+        self.last_success = dt_util.utcnow()
+        if result is self._last_result and self.data is not None:
+            snapshot = self.data
+        else:
+            previous = self.data
+            snapshot = self._async_process_result(result)
+            if previous is not None and (self.last_diff.added or self.last_diff.removed):
+                self.scheduler.record_change(now)
+
+        interval = self.scheduler.next_interval(now, bool(self.active.alerts))
+        self.update_interval = self.scheduler.staggered(interval, now)
+        return snapshot
+
+    def _async_process_result(self, result: dict) -> AlertSnapshot:
+        """Index a new API result, save it and announce new alerts."""
+        self._last_result = result
+
+        snapshot = build_snapshot(result)
+        self.clusters.update(self.api.agency_url, snapshot.alerts)
+        self._async_track_expiries(snapshot)
+        self.cache.async_schedule_save(
+            lambda: self.cache.serialize(snapshot, self.api.validators)
+        )
+        self.last_diff = snapshot.diff(self.data)
+        if self.history is not None and self.last_diff.added:
+            alerts = snapshot.by_id()
+            self.history.async_add(
+                self.api.agency_url, [alerts[alert_id] for alert_id in self.last_diff.added]
+            )
+        # Everything is new on the first refresh, so only announce later ones
+        if self.data is not None and self.last_diff.added:
+            self._fire_new_alert_events(snapshot, self.last_diff.added)
+        return snapshot
+
+    @callback
+    def _async_track_expiries(self, snapshot: AlertSnapshot) -> None:
+        """Track the active alerts of a new snapshot."""
+        self.active.reset(snapshot.expiring, dt_util.now())
+        self._async_schedule_expiry()
+
+    @callback
+    def _async_schedule_expiry(self) -> None:
+        """Schedule a call at the next expiry, replacing the previous one."""
+        if self._unsub_expiry is not None:
+            self._unsub_expiry()
+            self._unsub_expiry = None
+        if (next_expiry := self.active.next_expiry) is not None:
+            self._unsub_expiry = async_track_point_in_time(
+                self.hass, self._async_expire, next_expiry
+            )
+
+    @callback
+    def _async_expire(self, now) -> None:
+        """Drop the alerts that just expired and update the entities."""
+        self._unsub_expiry = None
+        if self.active.expire(now):
+            self.async_update_listeners()
+        self._async_schedule_expiry()
+
+    async def async_shutdown(self) -> None:
+        """Stop polling and cancel the expiry call."""
+        if self._unsub_expiry is not None:
+            self._unsub_expiry()
+            self._unsub_expiry = None
+        await super().async_shutdown()
+
+    def _fire_new_alert_events(self, snapshot: AlertSnapshot, alert_ids) -> None:
+        """Fire an event for each alert that appeared since the last refresh."""
+        alerts = snapshot.by_id()
+        for alert_id in alert_ids:
+            alert = alerts[alert_id]
+            self.hass.bus.async_fire(
+                EVENT_NEW_ALERT,
+                {
+                    "agency_url": self.api.agency_url,
+                    "alert_id": alert_id,
+                    "type": alert.type.value,
+                    "timestamp": alert.timestamp,
+                    "text": alert.text,
+                    "full_text": alert.full_text,
+                    "link": alert.link,
+                },
+            )
+
+
+@dataclass
+class NixleAgency:
+    """An agency page shared by every config entry that monitors it."""
+
+    api: NixleAPI
+    coordinator: NixleDataUpdateCoordinator
+    # Options of each attached config entry, by entry id
+    entries: dict[str, Mapping[str, Any]] = field(default_factory=dict)
+    # Days the agency's alerts are kept in the history
+    history_retention: int = DEFAULT_HISTORY_RETENTION
+    # Feed read instead of the HTML pages, if any entry set one
+    feed_url: str | None = None
+    # Used when an entry asked for the full texts of the alerts
+    details: NixleDetailFetcher | None = None
+    _unsub_watch: CALLBACK_TYPE | None = None
+
+    def apply_options(self) -> None:
+        """Configure the API and polling with the settings of all entries."""
+
+        def widest(key: str, default: int) -> int:
+            return max((o.get(key, default) for o in self.entries.values()), default=default)
+
+        def narrowest(key: str, default: int) -> int:
+            return min((o.get(key, default) for o in self.entries.values()), default=default)
+
+        self.api.set_pagination(
+            widest(CONF_MAX_PAGES, DEFAULT_MAX_PAGES),
+            widest(CONF_PAGE_CONCURRENCY, DEFAULT_PAGE_CONCURRENCY),
+            widest(CONF_HISTORY_DAYS, DEFAULT_HISTORY_DAYS),
+        )
+        self.api.max_page_size = widest(CONF_MAX_PAGE_SIZE, DEFAULT_MAX_PAGE_SIZE) * 1024
+        self.history_retention = widest(CONF_HISTORY_RETENTION, DEFAULT_HISTORY_RETENTION)
+        feed_url = next(
+            (o[CONF_FEED_URL] for o in self.entries.values() if o.get(CONF_FEED_URL)), None
+        )
+        if feed_url != self.feed_url:
+            self.feed_url = feed_url
+            self._set_source()
+        self.api.set_details(
+            self.details
+            if any(o.get(CONF_FETCH_DETAILS, False) for o in self.entries.values())
+            else None
+        )
+        self.api.tracing = any(o.get(CONF_TRACE_POLLS, False) for o in self.entries.values())
+        # Poll as often as the most demanding entry asked for
+        self.coordinator.set_interval_bounds(
+            timedelta(minutes=narrowest(CONF_MIN_INTERVAL, DEFAULT_MIN_INTERVAL)),
+            timedelta(minutes=narrowest(CONF_MAX_INTERVAL, DEFAULT_MAX_INTERVAL)),
+        )
+
+    def _set_source(self) -> None:
+        """Read the alerts from the feed, if set, or from the HTML pages."""
+        self.stop_watching()
+        source = create_source(self.feed_url)
+        self.api.set_source(source)
+        self._unsub_watch = source.async_watch(
+            self.coordinator.hass, self.coordinator.async_request_refresh
+        )
+
+    def stop_watching(self) -> None:
+        """Stop watching the source for changes."""
+        if self._unsub_watch is not None:
+            self._unsub_watch()
+            self._unsub_watch = None
+
+
+class NixleAgencyRegistry:
+    """Poll every configured agency.
+
+    There is one API client and coordinator per agency, shared by the config
+    entries that monitor it. All agencies fetch through one connection pool,
+    at most MAX_CONCURRENT_FETCHES at a time, run at most
+    MAX_CONCURRENT_PARSES parser steps at a time, and their polls are spread
+    evenly over the polling interval. Alerts reposted by several agencies
+    are clustered in one index, every alert seen is recorded in the alert
+    history, and the full texts of alerts are read through one detail
+    page cache.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the registry."""
+        self.hass = hass
+        self._agencies: dict[str, NixleAgency] = {}
+        self._session: aiohttp.ClientSession | None = None
+        self._fetch_semaphore = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
+        self._parse_semaphore = asyncio.Semaphore(MAX_CONCURRENT_PARSES)
+        # Random start of the phases, so installations do not poll in step
+        self._phase_origin = random.random()
+        self.clusters = AlertClusterIndex(self._async_clusters_changed)
+        # Whether the parsers were warmed up, by whether feeds were included
+        self._warmed_up: set[bool] = set()
+        self.history = NixleAlertHistory(hass, hass.config.path(HISTORY_FILE))
+        self.details = NixleDetailFetcher(hass, self._get_session)
+        self._unsub_compact = [
+            async_call_later(hass, HISTORY_COMPACT_DELAY, self._async_compact_history),
+            async_track_time_interval(
+                hass, self._async_compact_history, HISTORY_COMPACT_INTERVAL
+            ),
+        ]
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the session shared by all agencies, creating it if needed."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit_per_host=CONNECTIONS_PER_HOST,
+                    keepalive_timeout=KEEPALIVE_TIMEOUT,
+                    ssl=ssl_util.get_default_context(),
+                ),
+                headers={USER_AGENT: SERVER_SOFTWARE},
+                trace_configs=[create_trace_config()],
+            )
+        return self._session
+
+    async def _async_close_session(self) -> None:
+        """Close the shared session."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @callback
+    def _async_clusters_changed(self, agency_urls: set[str]) -> None:
+        """Update the entities of agencies whose shared alerts changed."""
+        for agency_url in agency_urls:
+            if (agency := self._agencies.get(agency_url)) is not None:
+                agency.coordinator.async_update_listeners()
+
+    async def _async_compact_history(self, _now=None) -> None:
+        """Remove alerts older than their agency's retention from the history."""
+        await self.history.async_compact(
+            {key: agency.history_retention for key, agency in self._agencies.items()},
+            DEFAULT_HISTORY_RETENTION,
+        )
+
+    def coordinators(self) -> dict[str, NixleDataUpdateCoordinator]:
+        """Return the coordinator of every agency, by normalized agency URL."""
+        return {key: agency.coordinator for key, agency in self._agencies.items()}
+
+    def _stagger(self) -> None:
+        """Spread the polls of all agencies evenly over their interval."""
+        for index, key in enumerate(sorted(self._agencies)):
+            phase = (self._phase_origin + index / len(self._agencies)) % 1
+            self._agencies[key].coordinator.scheduler.phase = phase
+
+    def _create_agency(self, agency_url: str) -> NixleAgency:
+        """Create the API client and coordinator for a new agency."""
+
+        api = NixleAPI(
+            agency_url,
+            self.hass,
+            self._get_session(),
+            self._fetch_semaphore,
+            self._parse_semaphore,
+        )
+        # The coordinator outlives the entry that happens to create it, so
+        # it must not be tied to that entry's unload
+        token = config_entries.current_entry.set(None)
+        try:
+            coordinator = NixleDataUpdateCoordinator(
+                self.hass, api, self.clusters, self.history
+            )
+        finally:
+            config_entries.current_entry.reset(token)
+        return NixleAgency(api, coordinator, details=self.details)
+
+    async def _async_warm_up(self, feed: bool) -> None:
+        """Warm up the parsers in the executor."""
+        try:
+            await self.hass.async_add_executor_job(warm_up, feed)
+        except Exception as err:  # pylint: disable=broad-except
+            # The parsers are then prepared on first use, in the executor too
+            self._warmed_up.discard(feed)
+            _LOGGER.warning("Error warming up the Nixle parsers: %s", err)
+
+    async def async_attach(self, entry: ConfigEntry) -> NixleDataUpdateCoordinator:
+        """Return the coordinator for an entry's agency, creating it if needed.
+
+        Raises ConfigEntryNotReady if there is neither cached nor live data
+        for the agency.
+        """
+        key = normalize_agency_url(entry.data[CONF_AGENCY_URL])
+        agency = self._agencies.get(key)
+        if agency is None:
+            agency = self._agencies[key] = self._create_agency(key)
+            self._stagger()
+        agency.entries[entry.entry_id] = entry.options
+        agency.apply_options()
+        if (feed := agency.feed_url is not None) not in self._warmed_up:
+            # Runs in the executor while the first page is downloaded
+            self._warmed_up.add(feed)
+            entry.async_create_background_task(
+                self.hass, self._async_warm_up(feed), "nixle parser warm-up"
+            )
+
+        coordinator = agency.coordinator
+        if coordinator.data is None:
+            await coordinator.async_initialize()
+            if coordinator.data is None:
+                await self.async_detach(entry)
+                raise ConfigEntryNotReady(
+                    f"Unable to fetch Nixle alerts from {key}"
+                ) from coordinator.last_exception
+
+        return coordinator
+
+    async def async_detach(self, entry: ConfigEntry) -> None:
+        """Release an entry's agency, shutting it down when no entry uses it."""
+        key = normalize_agency_url(entry.data[CONF_AGENCY_URL])
+        agency = self._agencies.get(key)
+        if agency is None or agency.entries.pop(entry.entry_id, None) is None:
+            return
+        if agency.entries:
+            agency.apply_options()
+            return
+        del self._agencies[key]
+        agency.stop_watching()
+        await agency.coordinator.async_shutdown()
+        self.clusters.remove(key)
+        if self._agencies:
+            self._stagger()
+        else:
+            await self._async_close_session()
+
+    async def async_shutdown(self, _event: Event | None = None) -> None:
+        """Stop polling every agency when Home Assistant stops."""
+        for unsub in self._unsub_compact:
+            unsub()
+        for agency in self._agencies.values():
+            agency.stop_watching()
+            await agency.coordinator.async_shutdown()
+        await self._async_close_session()
+        await self.history.async_close()
+
+
+def get_agency_registry(hass: HomeAssistant) -> NixleAgencyRegistry:
+    """Return the agency registry, creating it on first use."""
+    if DATA_AGENCIES not in hass.data:
+        registry = hass.data[DATA_AGENCIES] = NixleAgencyRegistry(hass)
+        # Coordinators are not tied to a config entry, so stop them here
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, registry.async_shutdown)
+    return hass.data[DATA_AGENCIES]
@@ -0,0 +1,247 @@
+"""Full alert texts read from the Nixle detail pages linked from an agency page."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable
+from html.parser import HTMLParser
+
+import aiohttp
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+from .page_reader import READ_CHUNK_SIZE, detect_encoding
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.details"
+
+# Detail pages downloaded at the same time, across all agencies
+DETAIL_CONCURRENCY = 2
+
+# Detail pages are only read up to this size
+MAX_DETAIL_SIZE = 256 * 1024
+
+DETAIL_TIMEOUT = aiohttp.ClientTimeout(total=20)
+
+# Texts kept, least recently used first out
+MAX_DETAILS = 1000
+
+# How long a text is kept, about as long as an alert stays on the page
+DETAIL_TTL = 30 * 24 * 3600
+
+# How long to wait before fetching a detail page that failed again
+FAILURE_TTL = 3600
+
+# Coalesce writes of polls that happen close together
+SAVE_DELAY = 30
+
+# Elements whose text is never part of the alert message
+_SKIPPED = frozenset({"script", "style", "noscript", "head", "nav", "header", "footer", "svg"})
+
+# Elements whose own text is one candidate for the message
+_BLOCKS = frozenset({"p", "div", "td", "article", "section", "main", "blockquote", "pre"})
+
+
+class DetailParser(HTMLParser):
+    """Find the message of an alert detail page.
+
+    The message is the longest block of text outside of navigation and
+    scripts, or the page description if that is longer.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the parser."""
+        super().__init__(convert_charrefs=True)
+        self._blocks: list[list[str]] = [[]]
+        self._skip_depth = 0
+        self._description = ""
+        self._longest = ""
+
+    @property
+    def text(self) -> str | None:
+        """Return the message found, if any."""
+        return max(self._longest, self._description, key=len) or None
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        """Open a block, or read the page description."""
+        if tag == "meta":
+            attributes = dict(attrs)
+            if attributes.get("name") == "description" or (
+                attributes.get("property") == "og:description"
+            ):
+                content = " ".join((attributes.get("content") or "").split())
+                if len(content) > len(self._description):
+                    self._description = content
+        elif tag in _SKIPPED:
+            self._skip_depth += 1
+        elif tag in _BLOCKS:
+            self._blocks.append([])
+
+    def handle_endtag(self, tag: str) -> None:
+        """Close a block."""
+        if tag in _SKIPPED:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in _BLOCKS and len(self._blocks) > 1:
+            self._end_block()
+
+    def handle_data(self, data: str) -> None:
+        """Add text to the innermost open block."""
+        if not self._skip_depth:
+            self._blocks[-1].append(data)
+
+    def close(self) -> None:
+        """Finish parsing and close the blocks left open."""
+        super().close()
+        while self._blocks:
+            self._end_block()
+
+    def _end_block(self) -> None:
+        """Keep the text of a block if it is the longest so far."""
+        text = " ".join("".join(self._blocks.pop()).split())
+        if len(text) > len(self._longest):
+            self._longest = text
+
+
+def parse_detail(data: bytes, charset: str | None) -> str | None:
+    """Return the message of a detail page. This is CPU bound and must not run in the event loop."""
+    parser = DetailParser()
+    parser.feed(data.decode(detect_encoding(charset, data), errors="replace"))
+    parser.close()
+    return parser.text
+
+
+class NixleDetailCache:
+    """Texts of detail pages by link, bounded in size and age.
+
+    Entries are (text, expires) where text is None for a page that had no
+    message or could not be read. The cache is saved between restarts.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the cache."""
+        self._store: Store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._entries: OrderedDict[str, tuple[str | None, float]] = OrderedDict()
+        self._load_lock = asyncio.Lock()
+        self._loaded = False
+
+    async def async_load(self) -> None:
+        """Load the saved entries that have not expired, once."""
+        async with self._load_lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            try:
+                data = await self._store.async_load()
+            except Exception as err:  # pylint: disable=broad-except
+                _LOGGER.warning("Ignoring unreadable Nixle detail cache: %s", err)
+                return
+            now = time.time()
+            for link, text, expires in (data or {}).get("entries", ()):
+                if expires > now and link not in self._entries:
+                    self._entries[link] = (text, expires)
+
+    def get(self, link: str, now: float) -> tuple[bool, str | None]:
+        """Return whether a link is cached, and its text."""
+        if (entry := self._entries.get(link)) is None:
+            return False, None
+        text, expires = entry
+        if expires <= now:
+            del self._entries[link]
+            return False, None
+        self._entries.move_to_end(link)
+        return True, text
+
+    def set(self, link: str, text: str | None, expires: float) -> None:
+        """Add the text of a link, dropping the least recently used beyond MAX_DETAILS."""
+        self._entries[link] = (text, expires)
+        self._entries.move_to_end(link)
+        while len(self._entries) > MAX_DETAILS:
+            self._entries.popitem(last=False)
+        self._store.async_delay_save(self._serialize, SAVE_DELAY)
+
+    def _serialize(self) -> dict:
+        """Return the entries to save, least recently used first."""
+        return {"entries": [[link, text, expires] for link, (text, expires) in self._entries.items()]}
+
+    def __len__(self) -> int:
+        """Return the number of cached links."""
+        return len(self._entries)
+
+
+class NixleDetailFetcher:
+    """Read the full texts of alerts from their detail pages.
+
+    Every page is downloaded once and its text cached until DETAIL_TTL, so
+    polls only download the pages of new alerts, DETAIL_CONCURRENCY at a
+    time across all agencies.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, get_session: Callable[[], aiohttp.ClientSession]
+    ) -> None:
+        """Initialize the fetcher."""
+        self.hass = hass
+        self._get_session = get_session
+        self._semaphore = asyncio.Semaphore(DETAIL_CONCURRENCY)
+        self.cache = NixleDetailCache(hass)
+        self.stats = {"hits": 0, "fetched": 0, "failed": 0}
+
+    async def async_get_texts(
+        self, links: Iterable[str | None], run_parser: Callable[..., Awaitable]
+    ) -> dict[str, str]:
+        """Return the full texts of the alerts with the given links, by link.
+
+        run_parser(func, *args) runs the parser off the event loop. Links
+        whose page has no message or cannot be read are left out.
+        """
+        await self.cache.async_load()
+        now = time.time()
+        texts = {}
+        missing = []
+        for link in dict.fromkeys(link for link in links if link):
+            cached, text = self.cache.get(link, now)
+            if not cached:
+                missing.append(link)
+            else:
+                self.stats["hits"] += 1
+                if text:
+                    texts[link] = text
+
+        results = await asyncio.gather(
+            *(self._async_fetch(link, run_parser) for link in missing)
+        )
+        now = time.time()
+        for link, (ok, text) in zip(missing, results):
+            self.stats["fetched" if ok else "failed"] += 1
+            self.cache.set(link, text, now + (DETAIL_TTL if ok else FAILURE_TTL))
+            if text:
+                texts[link] = text
+        return texts
+
+    async def _async_fetch(
+        self, link: str, run_parser: Callable[..., Awaitable]
+    ) -> tuple[bool, str | None]:
+        """Download and parse a detail page, return whether it could be read and its text."""
+        try:
+            async with self._semaphore, self._get_session().get(
+                link, timeout=DETAIL_TIMEOUT
+            ) as response:
+                response.raise_for_status()
+                chunks = []
+                received = 0
+                while received < MAX_DETAIL_SIZE and (
+                    chunk := await response.content.read(READ_CHUNK_SIZE)
+                ):
+                    chunks.append(chunk)
+                    received += len(chunk)
+                charset = response.charset
+        except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+            _LOGGER.debug("Error fetching Nixle detail page %s: %s", link, err)
+            return False, None
+        return True, await run_parser(parse_detail, b"".join(chunks)[:MAX_DETAIL_SIZE], charset)
@@ -0,0 +1,72 @@
+"""Diagnostics support for the Nixle integration."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    api = coordinator.api
+    snapshot = coordinator.data
+
+    return {
+        "entry": {
+            "data": dict(entry.data),
+            "options": dict(entry.options),
+        },
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "last_exception": repr(coordinator.last_exception)
+            if coordinator.last_exception
+            else None,
+            "update_interval": coordinator.update_interval.total_seconds()
+            if coordinator.update_interval
+            else None,
+            "poll_interval": coordinator.scheduler.interval.total_seconds(),
+            "phase": coordinator.scheduler.phase,
+            "stale_since": coordinator.stale_since.isoformat()
+            if coordinator.stale_since
+            else None,
+            "active_alerts": len(coordinator.active.alerts),
+            "next_expiry": coordinator.active.next_expiry.isoformat()
+            if coordinator.active.next_expiry
+            else None,
+        },
+        "snapshot": {
+            "alerts": len(snapshot.alerts),
+            "counts": dict(snapshot.counts),
+            "last_updated": snapshot.last_updated,
+            "active_until": snapshot.active_until.isoformat()
+            if snapshot.active_until
+            else None,
+        }
+        if snapshot is not None
+        else None,
+        "api": {
+            "agency_url": api.agency_url,
+            "source": repr(api.source),
+            "max_pages": api.max_pages,
+            "page_concurrency": api.page_concurrency,
+            "history_days": api.history_days,
+            "cache_stats": dict(api.cache_stats),
+            "circuit": api.circuit.as_dict(),
+            "details": {**api.details.stats, "cached": len(api.details.cache)}
+            if api.details is not None
+            else None,
+            "page_timings": list(api.page_timings),
+            "tracing": api.tracing,
+            "polls": [trace.as_dict() for trace in api.poll_traces],
+        },
+        "shared_alerts": [
+            cluster.attributes()
+            for cluster in coordinator.clusters.shared(api.agency_url)
+        ],
+    }
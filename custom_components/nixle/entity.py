@@ -0,0 +1,79 @@
+"""Base entity for the Nixle integration."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+from homeassistant.core import callback
+from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import DOMAIN
+
+
+@dataclass(frozen=True, slots=True)
+class AgencyInfo:
+    """Id and display name of an agency, derived once from its URL."""
+
+    agency_id: str
+    name: str
+
+    @classmethod
+    def from_url(cls, agency_url: str) -> AgencyInfo:
+        """Return the agency info for a URL such as https://local.nixle.com/some-agency/."""
+        parts = agency_url.split("/")
+        agency_id = parts[-2] if agency_url.endswith("/") else parts[-1]
+        return cls(agency_id, agency_id.replace("-", " ").title())
+
+
+class NixleEntity(CoordinatorEntity):
+    """Base entity for a Nixle agency.
+
+    Coordinator updates only write state when the values the entity derives
+    from the snapshot have changed, see _derived_key. When polls fail, the
+    entity keeps showing the last good snapshot for a while, see
+    NixleDataUpdateCoordinator.data_available.
+    """
+
+    def __init__(self, coordinator, entry, agency_name, agency_id):
+        """Initialize the entity."""
+        super().__init__(coordinator)
+        self._entry = entry
+        self._agency_name = agency_name
+        self._agency_id = agency_id
+        self._last_derived_key: Any = None
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        """Return device information."""
+        return DeviceInfo(
+            identifiers={(DOMAIN, self._agency_id)},
+            name=f"Nixle - {self._agency_name}",
+            manufacturer="Nixle",
+            model="Alert Service",
+            configuration_url=self._entry.data["agency_url"],
+        )
+
+    @property
+    def available(self) -> bool:
+        """Return True while there is fresh or recent enough data."""
+        return self.coordinator.data_available
+
+    def _stale_attributes(self) -> dict[str, Any]:
+        """Return when the data shown was last confirmed, if the last poll failed."""
+        if (stale_since := self.coordinator.stale_since) is None:
+            return {}
+        return {"stale_since": stale_since.isoformat()}
+
+    def _derived_key(self) -> Any:
+        """Return a value that changes whenever the entity's state would."""
+        return self.coordinator.data
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only if the derived values changed."""
+        key = (self.available, self.coordinator.stale_since, self._derived_key())
+        if key == self._last_derived_key:
+            return
+        self._last_derived_key = key
+        self.async_write_ha_state()
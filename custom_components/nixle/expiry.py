@@ -0,0 +1,49 @@
+"""Track which alerts of an agency are still active."""
+from __future__ import annotations
+
+import heapq
+from collections.abc import Iterable
+from datetime import datetime
+
+from .models import Alert
+
+
+class ActiveAlerts:
+    """The alerts that have not expired yet, in page order.
+
+    The expiries are kept in a min-heap, so the next one is known without
+    scanning the alerts and expire() only looks at the alerts that are due.
+    """
+
+    def __init__(self) -> None:
+        """Initialize with no active alerts."""
+        self._heap: list[tuple[datetime, str]] = []
+        self._active: dict[str, Alert] = {}
+        self.alerts: tuple[Alert, ...] = ()
+
+    def reset(self, alerts: Iterable[Alert], now: datetime) -> None:
+        """Track the alerts of a new snapshot."""
+        self._active = {
+            alert.id: alert
+            for alert in alerts
+            if alert.expiry is not None and now < alert.expiry
+        }
+        self._heap = [(alert.expiry, alert_id) for alert_id, alert in self._active.items()]
+        heapq.heapify(self._heap)
+        self.alerts = tuple(self._active.values())
+
+    @property
+    def next_expiry(self) -> datetime | None:
+        """Return when the next alert expires."""
+        return self._heap[0][0] if self._heap else None
+
+    def expire(self, now: datetime) -> bool:
+        """Drop the alerts that expired by now, return True if there were any."""
+        expired = False
+        while self._heap and self._heap[0][0] <= now:
+            _, alert_id = heapq.heappop(self._heap)
+            del self._active[alert_id]
+            expired = True
+        if expired:
+            self.alerts = tuple(self._active.values())
+        return expired
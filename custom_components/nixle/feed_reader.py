@@ -0,0 +1,200 @@
+"""Incremental reader of the alerts of an RSS or Atom feed."""
+from __future__ import annotations
+
+import logging
+import re
+from collections.abc import Awaitable, Callable
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from xml.etree.ElementTree import Element, ParseError, XMLPullParser
+
+import aiohttp
+
+from homeassistant.util import dt as dt_util
+
+from .const import ALERT_TYPES
+from .instrumentation import PollTrace, span
+from .page_reader import READ_CHUNK_SIZE, PageRead
+
+_LOGGER = logging.getLogger(__name__)
+
+_ATOM = "{http://www.w3.org/2005/Atom}"
+
+# Alert type named at the start of a title, as in "Advisory: Road closed"
+_TYPE_PREFIX_RE = re.compile(
+    rf"^\s*({'|'.join(ALERT_TYPES)})\s*[:\-]\s*", re.IGNORECASE
+)
+_TAG_RE = re.compile(r"<[^>]+>")
+
+# Type of items that do not name one
+DEFAULT_TYPE = "Community"
+
+_TYPES_BY_NAME = {name.lower(): name for name in ALERT_TYPES}
+
+
+def _text(element: Element | None) -> str:
+    """Return the stripped text of an element."""
+    if element is None or not element.text:
+        return ""
+    return element.text.strip()
+
+
+def _parse_time(value: str) -> datetime | None:
+    """Parse an RSS (RFC 822) or Atom (ISO 8601) date."""
+    if not value:
+        return None
+    parsed = dt_util.parse_datetime(value)
+    if parsed is None:
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
+    return parsed
+
+
+class FeedParser:
+    """Collect the alert rows of an RSS 2.0 or Atom feed fed in chunks.
+
+    Rows are (type, timestamp, text, link) like those of the HTML pages,
+    except that the timestamp is the ISO 8601 time the alert was posted.
+    Each item is dropped from the tree once read, so memory does not grow
+    with the size of the feed.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the parser."""
+        self._parser = XMLPullParser(events=("end",))
+        self._items: list[tuple[datetime | None, tuple]] = []
+        self.items_scanned = 0
+
+    def feed(self, data: bytes) -> None:
+        """Parse a chunk of the feed."""
+        self._parser.feed(data)
+        self._read_events()
+
+    def close(self) -> None:
+        """Finish parsing."""
+        self._parser.close()
+        self._read_events()
+
+    @property
+    def alerts(self) -> list[tuple]:
+        """Return the rows read so far, newest first."""
+        items = sorted(
+            self._items,
+            key=lambda item: item[0] or datetime.min.replace(tzinfo=dt_util.UTC),
+            reverse=True,
+        )
+        return [row for _, row in items]
+
+    def _read_events(self) -> None:
+        """Turn the items completed so far into rows."""
+        for _, element in self._parser.read_events():
+            if element.tag == "item":
+                self._add(*self._rss_item(element))
+            elif element.tag == f"{_ATOM}entry":
+                self._add(*self._atom_entry(element))
+            else:
+                continue
+            element.clear()
+
+    def _add(
+        self, title: str, body: str, link: str | None, posted: datetime | None, category: str
+    ) -> None:
+        """Add the row of an item."""
+        self.items_scanned += 1
+        text = title or _TAG_RE.sub(" ", body).strip()
+        alert_type = _TYPES_BY_NAME.get(category.lower())
+        if (match := _TYPE_PREFIX_RE.match(text)) is not None:
+            alert_type = alert_type or _TYPES_BY_NAME[match.group(1).lower()]
+            text = text[match.end() :]
+        text = " ".join(text.split())
+        if not text:
+            return
+        timestamp = dt_util.as_local(posted).isoformat() if posted else ""
+        self._items.append((posted, (alert_type or DEFAULT_TYPE, timestamp, text, link or None)))
+
+    @staticmethod
+    def _rss_item(item: Element) -> tuple:
+        """Return the fields of an RSS item."""
+        return (
+            _text(item.find("title")),
+            _text(item.find("description")),
+            _text(item.find("link")) or _text(item.find("guid")),
+            _parse_time(_text(item.find("pubDate"))),
+            _text(item.find("category")),
+        )
+
+    @staticmethod
+    def _atom_entry(entry: Element) -> tuple:
+        """Return the fields of an Atom entry."""
+        link = None
+        for element in entry.iterfind(f"{_ATOM}link"):
+            if element.get("rel", "alternate") == "alternate":
+                link = element.get("href")
+                break
+        category = entry.find(f"{_ATOM}category")
+        return (
+            _text(entry.find(f"{_ATOM}title")),
+            _text(entry.find(f"{_ATOM}summary")) or _text(entry.find(f"{_ATOM}content")),
+            link,
+            _parse_time(
+                _text(entry.find(f"{_ATOM}published")) or _text(entry.find(f"{_ATOM}updated"))
+            ),
+            category.get("term", "") if category is not None else "",
+        )
+
+
+def parse_feed(data: bytes) -> PageRead:
+    """Parse a whole feed. This is CPU bound and must not run in the event loop."""
+    parser = FeedParser()
+    try:
+        parser.feed(data)
+        parser.close()
+    except ParseError as err:
+        raise ValueError(f"Invalid feed: {err}") from err
+    return PageRead(parser.alerts, parser.items_scanned, len(data), False)
+
+
+async def async_read_feed_rows(
+    response: aiohttp.ClientResponse,
+    max_bytes: int,
+    run_parser: Callable[..., Awaitable],
+    trace: PollTrace | None = None,
+    known_hash: str | None = None,
+) -> PageRead:
+    """Parse the alert rows of a feed while it is downloaded.
+
+    Feeds are always parsed, known_hash is ignored and their rows are
+    hashed instead.
+
+    A feed larger than max_bytes is an error, since its items are not in
+    a known order and a cut feed could miss the newest ones.
+    """
+    parser = FeedParser()
+    received = 0
+    try:
+        while True:
+            with span(trace, "download"):
+                chunk = await response.content.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            received += len(chunk)
+            if received > max_bytes:
+                response.close()
+                raise ValueError(f"{response.url} is larger than {max_bytes} bytes")
+            with span(trace, "parse"):
+                await run_parser(parser.feed, chunk)
+        with span(trace, "parse"):
+            await run_parser(parser.close)
+    except ParseError as err:
+        raise ValueError(f"Invalid feed at {response.url}: {err}") from err
+
+    if trace is not None:
+        trace.bytes_received += received
+        trace.items_scanned += parser.items_scanned
+        trace.pages += 1
+
+    return PageRead(parser.alerts, parser.items_scanned, received, False)
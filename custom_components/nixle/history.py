@@ -0,0 +1,255 @@
+"""Searchable history of every alert seen, kept in a local SQLite database."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+from collections.abc import Iterable, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+
+from .models import Alert
+
+_LOGGER = logging.getLogger(__name__)
+
+# Database file in the Home Assistant configuration directory
+HISTORY_FILE = "nixle_history.db"
+
+# Bumped whenever the schema changes. An older database is dropped and
+# started again, since the alerts it held are only a local record.
+SCHEMA_VERSION = 1
+
+# Upper bound on the results of one search
+MAX_SEARCH_RESULTS = 500
+
+_SCHEMA = """
+CREATE TABLE alerts (
+    id INTEGER PRIMARY KEY,
+    agency_url TEXT NOT NULL,
+    alert_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    posted REAL NOT NULL,
+    first_seen REAL NOT NULL,
+    text TEXT NOT NULL,
+    link TEXT,
+    expiry REAL,
+    UNIQUE (agency_url, alert_id)
+);
+CREATE INDEX alerts_posted ON alerts (posted);
+CREATE INDEX alerts_agency_posted ON alerts (agency_url, posted);
+CREATE INDEX alerts_type_posted ON alerts (type, posted);
+CREATE VIRTUAL TABLE alerts_text USING fts5 (
+    text, content='alerts', content_rowid='id', tokenize='unicode61'
+);
+CREATE TRIGGER alerts_insert AFTER INSERT ON alerts BEGIN
+    INSERT INTO alerts_text (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER alerts_delete AFTER DELETE ON alerts BEGIN
+    INSERT INTO alerts_text (alerts_text, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+
+class NixleHistoryError(Exception):
+    """Raised when the history cannot be searched."""
+
+
+class NixleAlertHistory:
+    """Append-only record of the alerts of every agency, with full-text search.
+
+    SQLite connections are bound to a thread, so every statement runs on
+    one thread of its own, in the order it was submitted. Alerts are only
+    ever added; compaction deletes those posted before the retention period
+    of their agency.
+    """
+
+    def __init__(self, hass: HomeAssistant, path: str) -> None:
+        """Initialize the history."""
+        self.hass = hass
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="nixle_history")
+        self._connection: sqlite3.Connection | None = None
+        self._closed = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return the connection, opening and creating the database if needed."""
+        if self._connection is not None:
+            return self._connection
+        connection = sqlite3.connect(self.path)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        version = connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            if version:
+                _LOGGER.info("Recreating Nixle alert history in the current format")
+                connection.executescript(
+                    "DROP TABLE IF EXISTS alerts_text; DROP TABLE IF EXISTS alerts;"
+                )
+            # Freed pages are returned to the file by compaction
+            connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            connection.execute("VACUUM")
+            connection.executescript(
+                f"BEGIN; {_SCHEMA} PRAGMA user_version={SCHEMA_VERSION}; COMMIT;"
+            )
+        self._connection = connection
+        return connection
+
+    async def _async_run(self, func, *args) -> Any:
+        """Run a function on the history thread."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    @callback
+    def async_add(self, agency_url: str, alerts: Iterable[Alert]) -> None:
+        """Record alerts of an agency. Alerts already recorded are kept as they were."""
+        now = dt_util.utcnow().timestamp()
+        rows = [
+            (
+                agency_url,
+                alert.id,
+                alert.type.value,
+                alert.posted.timestamp(),
+                now,
+                # The detail page text, so searches find words cut from the page
+                alert.full_text or alert.text,
+                alert.link,
+                alert.expiry.timestamp() if alert.expiry else None,
+            )
+            for alert in alerts
+        ]
+        if rows and not self._closed:
+            self.hass.async_create_background_task(
+                self._async_run(self._add, rows), f"nixle history add {agency_url}"
+            )
+
+    def _add(self, rows: list[tuple]) -> None:
+        """Insert alert rows that are not recorded yet."""
+        try:
+            connection = self._connect()
+            with connection:
+                connection.executemany(
+                    "INSERT OR IGNORE INTO alerts (agency_url, alert_id, type, posted,"
+                    " first_seen, text, link, expiry) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+        except sqlite3.Error as err:
+            _LOGGER.error("Error recording Nixle alert history: %s", err)
+
+    async def async_search(
+        self,
+        query: str | None = None,
+        agency_url: str | None = None,
+        alert_types: list[str] | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        limit: int = 50,
+    ) -> list[dict[str, Any]]:
+        """Return the recorded alerts matching a search, newest first.
+
+        query uses the SQLite FTS5 syntax. Raises NixleHistoryError if it
+        is not valid.
+        """
+        clauses = []
+        params: list[Any] = []
+        if query:
+            clauses.append("id IN (SELECT rowid FROM alerts_text WHERE alerts_text MATCH ?)")
+            params.append(query)
+        if agency_url:
+            clauses.append("agency_url = ?")
+            params.append(agency_url)
+        if alert_types:
+            clauses.append(f"type IN ({', '.join('?' * len(alert_types))})")
+            params.extend(alert_types)
+        if start:
+            clauses.append("posted >= ?")
+            params.append(start.timestamp())
+        if end:
+            clauses.append("posted < ?")
+            params.append(end.timestamp())
+        sql = "SELECT * FROM alerts"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY posted DESC LIMIT ?"
+        params.append(min(limit, MAX_SEARCH_RESULTS))
+        return await self._async_run(self._search, sql, params)
+
+    def _search(self, sql: str, params: list[Any]) -> list[dict[str, Any]]:
+        """Run a search query."""
+        try:
+            rows = self._connect().execute(sql, params).fetchall()
+        except sqlite3.OperationalError as err:
+            raise NixleHistoryError(str(err)) from err
+        return [
+            {
+                "agency_url": row["agency_url"],
+                "id": row["alert_id"],
+                "type": row["type"],
+                "posted": _isoformat(row["posted"]),
+                "first_seen": _isoformat(row["first_seen"]),
+                "text": row["text"],
+                "link": row["link"],
+                "expires": _isoformat(row["expiry"]) if row["expiry"] else None,
+            }
+            for row in rows
+        ]
+
+    async def async_compact(self, retention: Mapping[str, int], default_retention: int) -> None:
+        """Delete alerts posted before the retention period, in days, of their agency.
+
+        Agencies that are not in retention use default_retention.
+        """
+        now = dt_util.utcnow()
+        cutoffs = {
+            agency_url: (now - timedelta(days=days)).timestamp()
+            for agency_url, days in retention.items()
+        }
+        default_cutoff = (now - timedelta(days=default_retention)).timestamp()
+        await self._async_run(self._compact, cutoffs, default_cutoff)
+
+    def _compact(self, cutoffs: dict[str, float], default_cutoff: float) -> None:
+        """Delete old alerts and give the freed space back."""
+        try:
+            connection = self._connect()
+            with connection:
+                deleted = sum(
+                    connection.execute(
+                        "DELETE FROM alerts WHERE agency_url = ? AND posted < ?",
+                        (agency_url, cutoff),
+                    ).rowcount
+                    for agency_url, cutoff in cutoffs.items()
+                )
+                deleted += connection.execute(
+                    "DELETE FROM alerts WHERE posted < ? AND agency_url NOT IN"
+                    f" ({', '.join('?' * len(cutoffs))})",
+                    (default_cutoff, *cutoffs),
+                ).rowcount
+                if deleted:
+                    connection.execute("INSERT INTO alerts_text (alerts_text) VALUES ('optimize')")
+            if deleted:
+                connection.execute("PRAGMA incremental_vacuum").fetchall()
+                _LOGGER.debug("Removed %s alerts from the Nixle alert history", deleted)
+        except sqlite3.Error as err:
+            _LOGGER.error("Error compacting Nixle alert history: %s", err)
+
+    async def async_close(self) -> None:
+        """Close the database once the pending writes are done."""
+        if self._closed:
+            return
+        self._closed = True
+        await self._async_run(self._close)
+        self._executor.shutdown(wait=False)
+
+    def _close(self) -> None:
+        """Close the connection."""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+def _isoformat(timestamp: float) -> str:
+    """Return a Unix timestamp as a local ISO 8601 string."""
+    return dt_util.as_local(dt_util.utc_from_timestamp(timestamp)).isoformat()
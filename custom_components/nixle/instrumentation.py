@@ -0,0 +1,113 @@
+"""Timing of Nixle polls, recorded only when enabled in the options."""
+from __future__ import annotations
+
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import SimpleNamespace
+
+import aiohttp
+
+# Number of polls kept for each agency
+POLL_TRACE_SIZE = 50
+
+_NULL_SPAN = nullcontext()
+
+
+@dataclass
+class PollTrace:
+    """Timings and counters of a single poll of an agency.
+
+    Spans are in milliseconds and add up over every page read by the poll.
+    """
+
+    started: datetime
+    spans: dict[str, float] = field(default_factory=dict)
+    bytes_received: int = 0
+    pages: int = 0
+    items_scanned: int = 0
+    alerts: int = 0
+    connections_reused: int = 0
+    outcome: str | None = None
+    error: str | None = None
+
+    def add_span(self, name: str, seconds: float) -> None:
+        """Add time to a span."""
+        self.spans[name] = round(self.spans.get(name, 0.0) + seconds * 1000, 3)
+
+    def as_dict(self) -> dict:
+        """Return the trace as a JSON serializable dict."""
+        return {
+            "started": self.started.isoformat(),
+            "spans_ms": dict(self.spans),
+            "bytes_received": self.bytes_received,
+            "pages": self.pages,
+            "items_scanned": self.items_scanned,
+            "alerts": self.alerts,
+            "connections_reused": self.connections_reused,
+            "outcome": self.outcome,
+            "error": self.error,
+        }
+
+
+class _Span:
+    """Context manager adding the time spent in its block to a span."""
+
+    __slots__ = ("_trace", "_name", "_start")
+
+    def __init__(self, trace: PollTrace, name: str) -> None:
+        """Initialize the span."""
+        self._trace = trace
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        self._trace.add_span(self._name, time.perf_counter() - self._start)
+
+
+def span(trace: PollTrace | None, name: str):
+    """Time a block into a span of trace, or do nothing if trace is None."""
+    if trace is None:
+        return _NULL_SPAN
+    return _Span(trace, name)
+
+
+def create_trace_config() -> aiohttp.TraceConfig:
+    """Return an aiohttp trace config recording into the request's PollTrace.
+
+    The trace is passed as trace_request_ctx. The connect span includes
+    DNS resolution, and wait is the time until the response headers.
+    """
+
+    def _start(name: str):
+        async def handler(session, ctx: SimpleNamespace, params) -> None:
+            if ctx.trace_request_ctx is not None:
+                setattr(ctx, name, time.perf_counter())
+
+        return handler
+
+    def _end(name: str):
+        async def handler(session, ctx: SimpleNamespace, params) -> None:
+            trace = ctx.trace_request_ctx
+            if trace is not None and (start := getattr(ctx, name, None)) is not None:
+                trace.add_span(name, time.perf_counter() - start)
+
+        return handler
+
+    async def on_connection_reuse(session, ctx: SimpleNamespace, params) -> None:
+        if ctx.trace_request_ctx is not None:
+            ctx.trace_request_ctx.connections_reused += 1
+
+    config = aiohttp.TraceConfig()
+    config.on_request_start.append(_start("wait"))
+    config.on_request_end.append(_end("wait"))
+    config.on_dns_resolvehost_start.append(_start("dns"))
+    config.on_dns_resolvehost_end.append(_end("dns"))
+    config.on_connection_create_start.append(_start("connect"))
+    config.on_connection_create_end.append(_end("connect"))
+    config.on_connection_reuseconn.append(on_connection_reuse)
+    return config
@@ -0,0 +1,121 @@
+"""Keyword subscriptions matched against the alerts of an agency."""
+from __future__ import annotations
+
+import re
+from collections import deque
+from collections.abc import Iterable
+from typing import TYPE_CHECKING
+
+from homeassistant.util import slugify
+
+if TYPE_CHECKING:
+    from .models import Alert, AlertSnapshot
+
+_WORD_RE = re.compile(r"[^\W_]+")
+
+
+def keyword_words(text: str) -> list[str]:
+    """Split a text into the lowercase words keywords are matched on."""
+    return _WORD_RE.findall(text.lower())
+
+
+def keyword_slug(text: str) -> str:
+    """Return the slug identifying the sensor of a keyword.
+
+    Keywords with the same slug, such as "café" and "cafe", share a sensor.
+    """
+    return slugify(text)
+
+
+class KeywordMatcher:
+    """Find which of a set of phrases occur in a text, in a single pass.
+
+    Phrases and texts are split into lowercase words, so matching ignores
+    case, punctuation and spacing, and a phrase only matches whole words.
+    The phrases are compiled into one Aho-Corasick automaton over words,
+    so a text is scanned once however many phrases there are.
+    """
+
+    def __init__(self, phrases: Iterable[str]) -> None:
+        """Compile the phrases."""
+        self.phrases = tuple(phrases)
+        self._goto: list[dict[str, int]] = [{}]
+        self._output: list[frozenset[int]] = [frozenset()]
+        for index, phrase in enumerate(self.phrases):
+            state = 0
+            for word in keyword_words(phrase):
+                if (next_state := self._goto[state].get(word)) is None:
+                    next_state = self._goto[state][word] = len(self._goto)
+                    self._goto.append({})
+                    self._output.append(frozenset())
+                state = next_state
+            # A phrase without words never matches
+            if state:
+                self._output[state] |= {index}
+
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and word not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(word, 0)
+                self._output[next_state] |= self._output[self._fail[next_state]]
+
+    def match(self, text: str) -> frozenset[int]:
+        """Return the indexes of the phrases found in a text."""
+        goto, fail, output = self._goto, self._fail, self._output
+        found: set[int] = set()
+        state = 0
+        for word in keyword_words(text):
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            if output[state]:
+                found |= output[state]
+        return frozenset(found)
+
+
+class KeywordSubscriptions:
+    """The alerts matching each keyword subscription of a config entry.
+
+    An alert is matched when it first appears, and its matches are kept by
+    alert id while it stays on the page, so a refresh only scans the new
+    alerts. The alerts of every phrase are indexed once per snapshot for
+    all the entities reading them.
+    """
+
+    def __init__(self, phrases: Iterable[str]) -> None:
+        """Initialize the subscriptions."""
+        self._matcher = KeywordMatcher(phrases)
+        self.phrases = self._matcher.phrases
+        # Text matched and phrase indexes found, by alert id
+        self._matches: dict[str, tuple[str, frozenset[int]]] = {}
+        self._snapshot: AlertSnapshot | None = None
+        self._alerts: tuple[tuple[Alert, ...], ...] = ()
+
+    def alerts(self, snapshot: AlertSnapshot, index: int) -> tuple[Alert, ...]:
+        """Return the alerts of a snapshot that match a phrase, newest first."""
+        if snapshot is not self._snapshot:
+            self._update(snapshot)
+        return self._alerts[index]
+
+    def _update(self, snapshot: AlertSnapshot) -> None:
+        """Match the new alerts of a snapshot and index the alerts by phrase."""
+        previous = self._matches
+        matches = {}
+        by_phrase: list[list[Alert]] = [[] for _ in self.phrases]
+        for alert in snapshot.alerts:
+            text = alert.full_text or alert.text
+            cached = previous.get(alert.id)
+            if cached is None or cached[0] != text:
+                cached = (text, self._matcher.match(text))
+            matches[alert.id] = cached
+            for index in cached[1]:
+                by_phrase[index].append(alert)
+        self._matches = matches
+        self._snapshot = snapshot
+        self._alerts = tuple(tuple(alerts) for alerts in by_phrase)
@@ -0,0 +1,208 @@
+"""Data models for the Nixle integration."""
+from __future__ import annotations
+
+import hashlib
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import StrEnum
+from types import MappingProxyType
+from typing import Mapping
+
+from homeassistant.util import dt as dt_util
+
+from .alert_dates import calculate_alert_posted_time, parse_alert_date
+from .clustering import simhash
+from .const import ALERT_TYPES
+
+
+class AlertType(StrEnum):
+    """Type of an alert, as labelled on the agency page."""
+
+    ALERT = "Alert"
+    ADVISORY = "Advisory"
+    COMMUNITY = "Community"
+
+    def __init__(self, value: str) -> None:
+        """Set the lowercase key used in counts and filters."""
+        self.key = ALERT_TYPES[value]
+
+
+@dataclass(frozen=True, slots=True)
+class Alert:
+    """A single alert read from an agency page."""
+
+    type: AlertType
+    timestamp: str
+    text: str
+    link: str | None
+    # Stable id, see alert_id
+    id: str
+    # When the alert was posted, estimated from its relative timestamp
+    # when the alert was first seen
+    posted: datetime = field(compare=False)
+    # Simhash of the text, used to find copies posted by other agencies
+    fingerprint: int = field(compare=False)
+    # When an "Alert" stops being active, if its text has a date
+    expiry: datetime | None = None
+    # Complete text from the detail page, when it is longer than text
+    full_text: str | None = None
+
+
+def alert_id(alert_type: str, text: str, link: str | None) -> str:
+    """Return a stable id for an alert.
+
+    The id is taken from the Nixle detail link when there is one, or is a
+    hash of the alert's type and text otherwise. The relative timestamp is
+    left out because it changes while the alert stays on the page.
+    """
+    if link:
+        return link.rstrip("/").rsplit("/", 1)[-1]
+    content = f"{alert_type}\n{text}".encode()
+    return hashlib.sha1(content).hexdigest()[:16]
+
+
+def create_alerts(
+    rows,
+    now: datetime | None = None,
+    details: Mapping[str, str] | None = None,
+    anchors: Mapping[str, datetime] | None = None,
+) -> list[Alert]:
+    """Build alert records from the (type, timestamp, text, link) rows of a page.
+
+    The posted time and text fingerprint of every alert and the expiry of
+    every "Alert" are evaluated here, once. details maps links to the text
+    of their detail page, which is used for the expiry when it is longer.
+    anchors maps alert ids to the posted times found when the alerts were
+    first seen, which are kept rather than estimated again from relative
+    timestamps that lose precision as alerts age.
+    This is CPU bound and must not be called from the event loop.
+    """
+    if now is None:
+        now = dt_util.now()
+    alerts = []
+    for alert_type, timestamp, text, link in rows:
+        alert_type = AlertType(alert_type)
+        # The same few relative timestamps repeat on every page
+        timestamp = sys.intern(timestamp)
+        full_text = details.get(link) if details and link else None
+        if full_text is not None and len(full_text) <= len(text):
+            full_text = None
+        stable_id = alert_id(alert_type, text, link)
+        if anchors is None or (posted := anchors.get(stable_id)) is None:
+            posted = calculate_alert_posted_time(timestamp, now)
+        alerts.append(
+            Alert(
+                type=alert_type,
+                timestamp=timestamp,
+                text=text,
+                link=link,
+                id=stable_id,
+                posted=posted,
+                fingerprint=simhash(text),
+                expiry=parse_alert_date(full_text or text, posted)
+                if alert_type is AlertType.ALERT
+                else None,
+                full_text=full_text,
+            )
+        )
+    return alerts
+
+
+@dataclass(frozen=True)
+class AlertDiff:
+    """Alert ids added, removed and kept between two snapshots."""
+
+    added: tuple[str, ...]
+    removed: tuple[str, ...]
+    unchanged: tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class AlertSnapshot:
+    """Immutable view of an agency's alerts, built once per refresh."""
+
+    alerts: tuple[Alert, ...]
+    # Stable id of each alert, in the same order as alerts
+    ids: tuple[str, ...]
+    counts: Mapping[str, int]
+    last_updated: str | None
+    by_type: Mapping[str, tuple[Alert, ...]]
+    latest: Mapping[str, Alert]
+    # Every "Alert" whose expiry could be parsed
+    expiring: tuple[Alert, ...]
+    active_until: datetime | None
+    _filtered: dict = field(default_factory=dict, compare=False, repr=False)
+    _attributes: dict = field(default_factory=dict, compare=False, repr=False)
+
+    def filtered(self, alert_types) -> tuple[Alert, ...]:
+        """Return the alerts matching a list of lowercase types, newest first."""
+        if not alert_types:
+            return self.alerts
+        key = frozenset(alert_types)
+        if (alerts := self._filtered.get(key)) is None:
+            alerts = self._filtered[key] = tuple(
+                alert for alert in self.alerts if alert.type.key in key
+            )
+        return alerts
+
+    def alert_attributes(self, alert: Alert) -> dict:
+        """Return an alert as a state attribute, built once per snapshot."""
+        key = ("alert", alert.id)
+        if (attributes := self._attributes.get(key)) is None:
+            attributes = self._attributes[key] = {
+                "type": alert.type.value,
+                "timestamp": alert.timestamp,
+                "text": alert.text,
+                "link": alert.link,
+            }
+        return attributes
+
+    def active_attributes(self, alert: Alert) -> dict:
+        """Return an active alert and its expiry as a state attribute."""
+        key = ("active", alert.id)
+        if (attributes := self._attributes.get(key)) is None:
+            attributes = self._attributes[key] = {
+                "type": alert.type.value,
+                "text": alert.text,
+                "link": alert.link,
+                "expires": alert.expiry.isoformat(),
+            }
+        return attributes
+
+    def by_id(self) -> dict[str, Alert]:
+        """Return the alerts keyed by their stable id."""
+        return dict(zip(self.ids, self.alerts))
+
+    def diff(self, previous: AlertSnapshot | None) -> AlertDiff:
+        """Compare the alert ids of this snapshot with a previous one."""
+        old_ids = previous.ids if previous is not None else ()
+        old, new = set(old_ids), set(self.ids)
+        current = dict.fromkeys(self.ids)
+        return AlertDiff(
+            added=tuple(i for i in current if i not in old),
+            removed=tuple(i for i in dict.fromkeys(old_ids) if i not in new),
+            unchanged=tuple(i for i in current if i in old),
+        )
+
+
+def build_snapshot(result: dict) -> AlertSnapshot:
+    """Index the result of NixleAPI.async_get_alerts."""
+    alerts = tuple(result["alerts"])
+
+    by_type: dict[str, list[Alert]] = {key: [] for key in ALERT_TYPES.values()}
+    for alert in alerts:
+        by_type[alert.type.key].append(alert)
+
+    expiring = tuple(alert for alert in alerts if alert.expiry is not None)
+
+    return AlertSnapshot(
+        alerts=alerts,
+        ids=tuple(alert.id for alert in alerts),
+        counts=MappingProxyType(dict(result["counts"])),
+        last_updated=result.get("last_updated"),
+        by_type=MappingProxyType({key: tuple(value) for key, value in by_type.items()}),
+        latest=MappingProxyType({key: value[0] for key, value in by_type.items() if value}),
+        expiring=expiring,
+        active_until=max((alert.expiry for alert in expiring), default=None),
+    )
@@ -1,98 +1,455 @@
 """API client for Nixle."""
+from __future__ import annotations
+
+import asyncio
+import hashlib
 import logging
-import re
-from datetime import datetime
+import time
+from collections import deque
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+
+import aiohttp
+
+from homeassistant.util import dt as dt_util
+
+from .circuit import CircuitBreaker, CircuitState
+from .const import (
+    ALERT_TYPES,
+    DEFAULT_HISTORY_DAYS,
+    DEFAULT_MAX_PAGE_SIZE,
+    DEFAULT_MAX_PAGES,
+    DEFAULT_PAGE_CONCURRENCY,
+)
+from .details import NixleDetailFetcher
+from .instrumentation import POLL_TRACE_SIZE, PollTrace, span
+from .models import Alert, create_alerts
+from .page_reader import PageRead
+from .sources import AlertSource, PageSource
 
 _LOGGER = logging.getLogger(__name__)
 
-# Lazy import to avoid issues during config flow loading
-BeautifulSoup = None
+# Connecting and every read of the body get their own limit, so a server
+# that accepts connections but stalls is given up on early
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=30, connect=10, sock_read=10)
+
+# Shorter limits for the request probing whether a failing server is back
+PROBE_TIMEOUT = aiohttp.ClientTimeout(total=10, connect=3, sock_read=5)
+
+
+class NixleRateLimitError(Exception):
+    """Nixle asked us to slow down."""
+
+    def __init__(self, message: str, retry_after: float | None) -> None:
+        """Initialize the error with the delay requested by the server."""
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class NixleCircuitOpenError(Exception):
+    """Requests are not made because Nixle kept failing."""
+
+    def __init__(self, message: str, retry_after: float) -> None:
+        """Initialize the error with the time left until the next probe."""
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _parse_retry_after(value: str | None) -> float | None:
+    """Return the delay in seconds of a Retry-After header."""
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        return None
+    return max(0.0, (retry_at - dt_util.utcnow()).total_seconds())
+
+
+def _rows_hash(rows: list[tuple]) -> str:
+    """Hash the alert rows of a page."""
+    digest = hashlib.sha1()
+    for row in rows:
+        digest.update("\x1f".join(value or "" for value in row).encode("utf-8", "surrogatepass"))
+        digest.update(b"\x1e")
+    return digest.hexdigest()
+
+
+def _is_past_horizon(alerts: list[Alert], horizon: datetime) -> bool:
+    """Return True if the oldest alert of a page was posted before the horizon."""
+    return alerts[-1].posted < horizon
+
+
+def _merge_pages(pages: list[list[Alert]]) -> list[Alert]:
+    """Concatenate pages in order, dropping alerts repeated across pages."""
+    seen = set()
+    merged = []
+    for alerts in pages:
+        for alert in alerts:
+            if alert.id not in seen:
+                seen.add(alert.id)
+                merged.append(alert)
+    return merged
+
+
+def count_alerts(alerts: list[Alert]) -> dict:
+    """Count alerts by type."""
+    counts = dict.fromkeys(ALERT_TYPES.values(), 0)
+    for alert in alerts:
+        counts[alert.type.key] += 1
+    return {"total": len(alerts), **counts}
 
 
 class NixleAPI:
     """API client for Nixle local pages."""
 
-    def __init__(self, agency_url: str, hass):
-        """Initialize the API client."""
-        global BeautifulSoup
-        if BeautifulSoup is None:
-            from bs4 import BeautifulSoup as BS
-            BeautifulSoup = BS
-            
+    def __init__(
+        self,
+        agency_url: str,
+        hass,
+        session=None,
+        fetch_semaphore: asyncio.Semaphore | None = None,
+        parse_semaphore: asyncio.Semaphore | None = None,
+    ):
+        """Initialize the API client.
+
+        session, fetch_semaphore and parse_semaphore are shared by all
+        agencies when the client is created by the agency registry. Without
+        them, Home Assistant's shared session is used and fetches and
+        parser steps are not limited.
+        """
         self.agency_url = agency_url.rstrip("/")
         self.hass = hass
-        
+        self._session = session
+        self._fetch_semaphore = fetch_semaphore or nullcontext()
+        self._parse_semaphore = parse_semaphore or nullcontext()
+        self._etag: str | None = None
+        self._last_modified: str | None = None
+        self._content_hash: str | None = None
+        self._body_size = 0
+        self._last_result: dict | None = None
+        # Posted time of the alerts last read, by alert id, see create_alerts
+        self._anchors: dict[str, datetime] = {}
+        self._inflight: asyncio.Future | None = None
+        self.max_pages = DEFAULT_MAX_PAGES
+        self.page_concurrency = DEFAULT_PAGE_CONCURRENCY
+        self.history_days = DEFAULT_HISTORY_DAYS
+        self.max_page_size = DEFAULT_MAX_PAGE_SIZE * 1024
+        self.page_timings: list[dict] = []
+        self.cache_stats = {
+            "hits": 0,
+            "misses": 0,
+            "bytes_saved": 0,
+            "last_poll": None,
+        }
+        # Per-poll timings, only recorded while tracing is enabled
+        self.tracing = False
+        self.poll_traces: deque[PollTrace] = deque(maxlen=POLL_TRACE_SIZE)
+        self._trace: PollTrace | None = None
+        self.source: AlertSource = PageSource()
+        self.circuit = CircuitBreaker()
+        # Reads the full texts from the detail pages, if enabled
+        self.details: NixleDetailFetcher | None = None
+
+    def set_pagination(self, max_pages: int, page_concurrency: int, history_days: int) -> None:
+        """Configure how many pages are read on each poll."""
+        if (max_pages, history_days) != (self.max_pages, self.history_days):
+            # The cached result was read with different settings
+            self._content_hash = None
+            self._etag = self._last_modified = None
+        self.max_pages = max_pages
+        self.page_concurrency = page_concurrency
+        self.history_days = history_days
+
+    def set_source(self, source: AlertSource) -> None:
+        """Read the alerts from another source."""
+        self.source = source
+        # The validators belong to the previous source
+        self._content_hash = None
+        self._etag = self._last_modified = None
+
+    def set_details(self, details: NixleDetailFetcher | None) -> None:
+        """Read the full texts of the first page alerts with a detail fetcher, or not."""
+        if details is not self.details:
+            # The cached result was built with or without the full texts
+            self._content_hash = None
+            self._etag = self._last_modified = None
+        self.details = details
+
+    @property
+    def has_result(self) -> bool:
+        """Return True if there is a result to reuse when the source is unchanged."""
+        return self._last_result is not None
+
+    @property
+    def fetch_settings(self) -> list:
+        """Return the settings that change what a poll reads."""
+        return [repr(self.source), self.max_pages, self.history_days, self.details is not None]
+
+    @property
+    def validators(self) -> dict:
+        """Return what is needed to validate the cached result."""
+        return {
+            "etag": self._etag,
+            "last_modified": self._last_modified,
+            "content_hash": self._content_hash,
+            "settings": self.fetch_settings,
+        }
+
+    def restore(self, result: dict, validators: dict) -> None:
+        """Use a result saved by a previous run as the cached result.
+
+        The validators are only used if the result was read with the
+        current settings, otherwise the next poll reads everything again.
+        """
+        self._last_result = result
+        self._anchors = {alert.id: alert.posted for alert in result["alerts"]}
+        if validators.get("settings") != self.fetch_settings:
+            return
+        self._etag = validators.get("etag")
+        self._last_modified = validators.get("last_modified")
+        self._content_hash = validators.get("content_hash")
+
     def _get_session(self):
         """Get aiohttp session."""
+        if self._session is not None:
+            return self._session
         from homeassistant.helpers.aiohttp_client import async_get_clientsession
         return async_get_clientsession(self.hass)
 
+    async def async_fetch(self, url: str, reader, conditional: bool = True) -> PageRead | None:
+        """Download a page and parse its alert rows, or return None if it is unchanged.
+
+        reader(response, max_bytes, run_parser, trace, known_hash) parses
+        the page, reading at most max_page_size bytes. It may skip parsing a
+        page whose content hash is known_hash. Raises
+        NixleCircuitOpenError without making a request while the server
+        is considered down, see CircuitBreaker.
+        """
+        circuit = self.circuit
+        if not circuit.allow_request():
+            raise NixleCircuitOpenError(
+                f"{url} kept failing, next try in {circuit.retry_after:.0f} s",
+                circuit.retry_after,
+            )
+        timeout = PROBE_TIMEOUT if circuit.state is CircuitState.HALF_OPEN else REQUEST_TIMEOUT
+        try:
+            page = await self._async_fetch(url, reader, conditional, timeout)
+        except NixleRateLimitError as err:
+            circuit.record_failure(err.retry_after)
+            raise
+        except aiohttp.ClientResponseError as err:
+            # Only server errors mean the server is down
+            if err.status >= 500:
+                circuit.record_failure()
+            else:
+                circuit.record_success()
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            circuit.record_failure()
+            raise
+        except asyncio.CancelledError:
+            circuit.release()
+            raise
+        except Exception:
+            # The server answered, the page could not be read
+            circuit.record_success()
+            raise
+        circuit.record_success()
+        return page
+
+    async def _async_fetch(
+        self, url: str, reader, conditional: bool, timeout: aiohttp.ClientTimeout
+    ) -> PageRead | None:
+        """Download and parse a page, see async_fetch."""
+        headers = {}
+        if conditional and self._last_result is not None:
+            if self._etag:
+                headers["If-None-Match"] = self._etag
+            if self._last_modified:
+                headers["If-Modified-Since"] = self._last_modified
+
+        session = self._get_session()
+        async with self._fetch_semaphore, session.get(
+            url, headers=headers, timeout=timeout, trace_request_ctx=self._trace
+        ) as response:
+            if response.status == 304 and self._last_result is not None:
+                return None
+            if response.status in (429, 503):
+                raise NixleRateLimitError(
+                    f"{url} returned {response.status}",
+                    _parse_retry_after(response.headers.get("Retry-After")),
+                )
+            response.raise_for_status()
+            known_hash = None
+            if conditional and self._last_result is not None:
+                known_hash = self._content_hash
+            page = await reader(
+                response, self.max_page_size, self._async_run_parser, self._trace, known_hash
+            )
+            if conditional:
+                self._etag = response.headers.get("ETag")
+                self._last_modified = response.headers.get("Last-Modified")
+            return page
+
+    async def _async_run_parser(self, func, *args):
+        """Run a parser step in the executor without blocking the event loop."""
+        async with self._parse_semaphore:
+            return await self.hass.async_add_executor_job(func, *args)
+
+    async def _async_create_alerts(
+        self, rows: list[tuple], details: dict[str, str] | None = None
+    ) -> list[Alert]:
+        """Build the alert records of a page in the executor."""
+        with span(self._trace, "expiry"):
+            return await self._async_run_parser(
+                create_alerts, rows, None, details, self._anchors
+            )
+
+    async def _async_get_page(self, page: int) -> list[Alert]:
+        """Fetch and parse one of the older pages, recording its timing."""
+        start = time.monotonic()
+        read = await self.source.async_read(self, page, False)
+        alerts = await self._async_create_alerts(read.rows)
+        self.page_timings.append(
+            {"page": page, "seconds": round(time.monotonic() - start, 3), "alerts": len(alerts)}
+        )
+        return alerts
+
+    async def _async_get_older_pages(self, first_page: list[Alert]) -> list[list[Alert]]:
+        """Fetch pages 2..max_pages, stopping early at the history horizon.
+
+        Pages are fetched page_concurrency at a time. Fetching stops after a
+        batch that contains an empty page or an alert posted before the
+        horizon.
+        """
+        horizon = dt_util.now() - timedelta(days=self.history_days)
+        if not first_page or _is_past_horizon(first_page, horizon):
+            return []
+
+        pages = []
+        next_page = 2
+        while next_page <= self.max_pages:
+            batch = range(next_page, min(next_page + self.page_concurrency, self.max_pages + 1))
+            next_page = batch.stop
+            results = await asyncio.gather(
+                *(self._async_get_page(page) for page in batch), return_exceptions=True
+            )
+            for page, alerts in zip(batch, results):
+                if isinstance(alerts, BaseException):
+                    # Older pages are best effort, keep what was fetched so far
+                    _LOGGER.warning(
+                        "Error fetching page %s of %s: %s", page, self.agency_url, alerts
+                    )
+                    return pages
+                if not alerts:
+                    return pages
+                pages.append(alerts)
+                if _is_past_horizon(alerts, horizon):
+                    return pages
+        return pages
+
+    def _record_poll(self, outcome: str, bytes_saved: int) -> None:
+        """Update the conditional fetch counters after a poll."""
+        stats = self.cache_stats
+        stats["hits" if outcome != "changed" else "misses"] += 1
+        stats["bytes_saved"] += bytes_saved
+        stats["last_poll"] = outcome
+        if self._trace is not None:
+            self._trace.outcome = outcome
+        _LOGGER.debug(
+            "Nixle poll of %s: %s (hits=%s, misses=%s, bytes_saved=%s)",
+            self.agency_url,
+            outcome,
+            stats["hits"],
+            stats["misses"],
+            stats["bytes_saved"],
+        )
+
     async def async_get_alerts(self) -> dict:
-        """Get alerts from Nixle."""
+        """Get alerts from Nixle.
+
+        Concurrent callers share a single request. If the page has not
+        changed since the last poll, the previous result object is returned
+        as is, without parsing the page again.
+        """
+        if self._inflight is None or self._inflight.done():
+            self._inflight = self.hass.async_create_task(
+                self._async_get_alerts(), f"nixle fetch {self.agency_url}"
+            )
+        # Shield so a cancelled caller does not cancel the shared request
+        return await asyncio.shield(self._inflight)
+
+    async def _async_get_alerts(self) -> dict:
+        """Fetch and parse the agency page."""
+        trace = None
+        if self.tracing:
+            trace = self._trace = PollTrace(dt_util.utcnow())
+            self.poll_traces.append(trace)
+            poll_start = time.perf_counter()
         try:
-            session = self._get_session()
-            url = f"{self.agency_url}/?page=1"
-            async with session.get(url, timeout=30) as response:
-                response.raise_for_status()
-                html = await response.text()
-                
-            # Use html.parser instead of lxml - it's built into Python
-            soup = BeautifulSoup(html, "html.parser")
-            
-            # Find all alert items
-            alerts = []
-            alert_items = soup.find_all("li")
-            
-            for item in alert_items:
-                # Look for alert type indicator
-                alert_type_elem = item.find(string=lambda text: text and text.strip() in ["Alert", "Advisory", "Community"])
-                
-                if not alert_type_elem:
-                    continue
-                
-                alert_type = alert_type_elem.strip()
-                
-                # Get the timestamp
-                time_elem = item.find("h2")
-                time_text = time_elem.get_text(strip=True) if time_elem else "Unknown"
-                
-                # Get the alert text/summary
-                # The text is typically in a paragraph after the heading
-                text_elem = None
-                for sibling in item.find_all(string=True):
-                    text = sibling.strip()
-                    if text and text not in [alert_type, time_text, "More »"]:
-                        if len(text) > 20:  # Likely the actual alert content
-                            text_elem = text
-                            break
-                
-                alert_text = text_elem if text_elem else "No description available"
-                
-                # Get the detail link if available
-                link_elem = item.find("a", href=re.compile(r"nixle\.us/"))
-                link = link_elem["href"] if link_elem else None
-                
-                alerts.append({
-                    "type": alert_type,
-                    "timestamp": time_text,
-                    "text": alert_text,
-                    "link": link,
-                })
-            
-            # Count alerts by type
-            alert_counts = {
-                "total": len(alerts),
-                "alert": sum(1 for a in alerts if a["type"] == "Alert"),
-                "advisory": sum(1 for a in alerts if a["type"] == "Advisory"),
-                "community": sum(1 for a in alerts if a["type"] == "Community"),
-            }
-            
-            return {
+            start = time.monotonic()
+            read = await self.source.async_read(self, 1, True)
+            if read is None:
+                self._record_poll("not_modified", self._body_size)
+                return self._last_result
+
+            content_hash = read.content_hash
+            if content_hash is None:
+                with span(trace, "hash"):
+                    content_hash = _rows_hash(read.rows)
+            if content_hash == self._content_hash and self._last_result is not None:
+                self._record_poll("unchanged", 0)
+                return self._last_result
+
+            details = None
+            if self.details is not None:
+                # Only new alerts miss the cache, so this rarely downloads
+                with span(trace, "details"):
+                    details = await self.details.async_get_texts(
+                        (row[3] for row in read.rows), self._async_run_parser
+                    )
+            alerts = await self._async_create_alerts(read.rows, details)
+            self.page_timings = [
+                {"page": 1, "seconds": round(time.monotonic() - start, 3), "alerts": len(alerts)}
+            ]
+
+            if self.max_pages > 1 and self.source.paged:
+                # Older pages only change when a new alert is posted, which
+                # always changes the first page, so they need no validators
+                older_pages = await self._async_get_older_pages(alerts)
+                if older_pages:
+                    alerts = _merge_pages([alerts, *older_pages])
+
+            if trace is not None:
+                trace.alerts = len(alerts)
+            self._last_result = {
                 "alerts": alerts,
-                "counts": alert_counts,
-                "last_updated": datetime.now().isoformat(),
+                "counts": count_alerts(alerts),
+                "last_updated": dt_util.utcnow().isoformat(),
             }
-            
+            # Alerts that left the pages read lose their anchor
+            self._anchors = {alert.id: alert.posted for alert in alerts}
+            self._content_hash = content_hash
+            self._body_size = read.bytes_received
+            self._record_poll("changed", 0)
+            return self._last_result
+
         except Exception as err:
-            _LOGGER.error("Error fetching Nixle alerts: %s", err)
+            if trace is not None:
+                trace.error = repr(err)
+            if isinstance(err, NixleCircuitOpenError):
+                _LOGGER.debug("Not fetching Nixle alerts: %s", err)
+            else:
+                _LOGGER.error("Error fetching Nixle alerts: %s", err)
             raise
+        finally:
+            if trace is not None:
+                trace.add_span("total", time.perf_counter() - poll_start)
+                self._trace = None
+                _LOGGER.debug("Nixle poll of %s: %s", self.agency_url, trace.as_dict())
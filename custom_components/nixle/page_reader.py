@@ -0,0 +1,304 @@
+"""Streaming reader feeding a Nixle page to the alert parser as it arrives."""
+from __future__ import annotations
+
+import codecs
+import hashlib
+import logging
+import re
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+import aiohttp
+
+from .alert_parser import NixleAlertParser
+from .instrumentation import PollTrace, span
+
+_LOGGER = logging.getLogger(__name__)
+
+# Bytes read from the connection at a time
+READ_CHUNK_SIZE = 64 * 1024
+
+# Bytes looked at for a <meta charset>, as in the HTML standard
+SNIFF_SIZE = 1024
+
+# Unread bytes after the alert list that are still read, so the connection
+# can be reused. Beyond this the connection is closed instead.
+DRAIN_LIMIT = 64 * 1024
+
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w.:-]+)""", re.IGNORECASE)
+
+# Start of the alert region, the first <li> start tag, which <link> is not
+_REGION_START_RE = re.compile(r"<li[\s/>]", re.IGNORECASE)
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+def detect_encoding(charset: str | None, head: bytes) -> str:
+    """Return the encoding of a page.
+
+    A byte order mark wins, then the charset of the Content-Type header,
+    then a <meta> charset in the first bytes. UTF-8 is used otherwise.
+    """
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+    candidates = [charset]
+    if match := _META_CHARSET_RE.search(head[:SNIFF_SIZE]):
+        candidates.append(match.group(1).decode("ascii"))
+    for candidate in candidates:
+        if not candidate:
+            continue
+        try:
+            return codecs.lookup(candidate).name
+        except LookupError:
+            _LOGGER.debug("Ignoring unknown charset %s", candidate)
+    return "utf-8"
+
+
+@dataclass
+class PageRead:
+    """The alert rows read from a page."""
+
+    # None if the page was not parsed because its content_hash was known
+    rows: list[tuple] | None
+    items_scanned: int
+    bytes_received: int
+    # True if the page was cut at the size limit
+    truncated: bool
+    # Hash of the alert region, None if the reader does not compute one
+    content_hash: str | None = None
+
+
+class AlertRegionHash:
+    """Incremental hash of the markup from the first <li> to the end of the alert list.
+
+    The rest of a Nixle page carries tokens and ads that change on every
+    request, the alert list only changes with the alerts. The markup is
+    hashed as decoded text, since the parser reports the end of the list
+    in characters. At most limit characters of the region are hashed.
+    """
+
+    def __init__(self, limit: int | None = None) -> None:
+        """Initialize the hash."""
+        self.limit = limit
+        self.length = 0
+        self._digest = hashlib.sha1()
+        self._offset = 0
+        self._started = False
+        # End of the text read so far, while looking for the region start
+        self._tail = ""
+
+    @property
+    def complete(self) -> bool:
+        """Return True once limit characters of the region have been hashed."""
+        return self.limit is not None and self.length >= self.limit
+
+    @property
+    def value(self) -> str:
+        """Return the hash and the length of the region hashed so far."""
+        return f"{self.length}:{self._digest.hexdigest()}"
+
+    def update(self, text: str, end: int | None = None) -> None:
+        """Hash the next text of the page, up to the offset end if given."""
+        start = self._offset
+        self._offset += len(text)
+        if not self._started:
+            text = self._tail + text
+            match = _REGION_START_RE.search(text)
+            if match is None:
+                self._tail = text[-3:]
+                return
+            self._started = True
+            text = text[match.start() :]
+            start = self._offset - len(text)
+        stop = len(text)
+        if end is not None:
+            stop = min(stop, end - start)
+        if self.limit is not None:
+            stop = min(stop, self.limit - self.length)
+        if stop > 0:
+            self._digest.update(text[:stop].encode("utf-8", "surrogatepass"))
+            self.length += stop
+
+    @classmethod
+    def from_value(cls, value: str | None) -> AlertRegionHash | None:
+        """Return a hash to compare a page with a stored value, if it is one."""
+        length, _, digest = (value or "").partition(":")
+        if not length.isdigit() or not digest:
+            return None
+        return cls(int(length))
+
+
+def alert_region_hash(html: str) -> str | None:
+    """Return the content hash of a whole page, None if its alert list has no end.
+
+    This is CPU bound and must not be called from the event loop.
+    """
+    parser = NixleAlertParser()
+    parser.feed(html)
+    if parser.list_end is None:
+        return None
+    region = AlertRegionHash()
+    region.update(html, parser.list_end)
+    return region.value
+
+
+class _AlertPageSink:
+    """Feeds the text of a page to the parser and hashes its alert region.
+
+    With a known hash, text is held back from the parser until the region
+    is known to differ, so an unchanged page is never parsed. Only the
+    start of the page up to the end of the known region is held.
+    """
+
+    def __init__(
+        self,
+        run_parser: Callable[..., Awaitable],
+        trace: PollTrace | None,
+        known_hash: str | None,
+    ) -> None:
+        """Initialize the sink."""
+        self.parser = NixleAlertParser()
+        self.region = AlertRegionHash()
+        self.unchanged = False
+        self._run_parser = run_parser
+        self._trace = trace
+        self._known_hash = known_hash
+        self._known = AlertRegionHash.from_value(known_hash)
+        self._held: list[str] = []
+
+    @property
+    def done(self) -> bool:
+        """Return True once nothing more of the page is needed."""
+        return self.unchanged or self.parser.done
+
+    async def async_feed(self, text: str) -> None:
+        """Take the next text of the page."""
+        if self._known is not None:
+            with span(self._trace, "hash"):
+                self._known.update(text)
+            self._held.append(text)
+            if not self._known.complete:
+                return
+            if self._known.value == self._known_hash:
+                self.unchanged = True
+                return
+            await self.async_flush()
+            return
+        with span(self._trace, "parse"):
+            await self._run_parser(self.parser.feed, text)
+        with span(self._trace, "hash"):
+            self.region.update(text, self.parser.list_end)
+
+    async def async_flush(self) -> None:
+        """Parse the text held back, the page differs from the known hash."""
+        if self._known is None:
+            return
+        self._known = None
+        text = "".join(self._held)
+        self._held.clear()
+        await self.async_feed(text)
+
+
+async def async_read_alert_rows(
+    response: aiohttp.ClientResponse,
+    max_bytes: int,
+    run_parser: Callable[..., Awaitable],
+    trace: PollTrace | None = None,
+    known_hash: str | None = None,
+) -> PageRead:
+    """Parse the alert rows of a page while it is downloaded.
+
+    Reading stops once the alert list has ended or max_bytes have been
+    read. When cut at the size limit, the alert that was being read is
+    dropped. run_parser(func, *args) runs a parser step off the event loop.
+
+    If the alert region matches known_hash, the content hash of the last
+    read, reading stops at its end and the page is returned without rows.
+    """
+    sink = _AlertPageSink(run_parser, trace, known_hash)
+    parser = sink.parser
+    stream = response.content
+    decoder = None
+    head = b""
+    received = 0
+    truncated = False
+
+    while not sink.done:
+        with span(trace, "download"):
+            chunk = await stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        if received + len(chunk) > max_bytes:
+            chunk = chunk[: max_bytes - received]
+            truncated = True
+        received += len(chunk)
+
+        if decoder is None:
+            # Detect the encoding once, from the start of the page
+            head += chunk
+            if len(head) < SNIFF_SIZE and not truncated:
+                continue
+            decoder = codecs.getincrementaldecoder(
+                detect_encoding(response.charset, head)
+            )(errors="replace")
+            chunk, head = head, b""
+
+        await sink.async_feed(decoder.decode(chunk))
+        if truncated:
+            break
+
+    if not sink.unchanged:
+        if decoder is None:
+            # The whole page was shorter than SNIFF_SIZE
+            decoder = codecs.getincrementaldecoder(
+                detect_encoding(response.charset, head)
+            )(errors="replace")
+            await sink.async_feed(decoder.decode(head))
+        await sink.async_feed(decoder.decode(b"", final=True))
+        await sink.async_flush()
+
+    if truncated:
+        _LOGGER.warning(
+            "%s is larger than %s bytes, only the alerts before that are used",
+            response.url,
+            max_bytes,
+        )
+        response.close()
+    else:
+        if not sink.unchanged:
+            with span(trace, "parse"):
+                await run_parser(parser.close)
+        received += await _async_release(response)
+
+    if trace is not None:
+        trace.bytes_received += received
+        trace.items_scanned += parser.items_scanned
+        trace.pages += 1
+
+    if sink.unchanged:
+        return PageRead(None, 0, received, truncated, known_hash)
+    content_hash = sink.region.value if parser.list_end is not None else None
+    return PageRead(parser.alerts, parser.items_scanned, received, truncated, content_hash)
+
+
+async def _async_release(response: aiohttp.ClientResponse) -> int:
+    """Read a short unread tail so the connection can be reused.
+
+    Returns the number of bytes read. The connection is closed if more than
+    DRAIN_LIMIT bytes are left.
+    """
+    stream = response.content
+    drained = 0
+    while not stream.at_eof() and drained < DRAIN_LIMIT:
+        data = await stream.read(DRAIN_LIMIT - drained)
+        if not data:
+            break
+        drained += len(data)
+    if not stream.at_eof():
+        response.close()
+    return drained
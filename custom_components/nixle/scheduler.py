@@ -0,0 +1,108 @@
+"""Adaptive polling interval for Nixle agencies."""
+from __future__ import annotations
+
+import random
+from collections import deque
+from datetime import datetime, timedelta
+
+# Changes older than this no longer influence the interval
+CHANGE_WINDOW = timedelta(hours=24)
+
+# How many polls to aim for between two changes of the page
+POLLS_PER_CHANGE = 4
+
+# Random spread applied to back-off delays so agencies do not retry in step
+BACKOFF_JITTER = 0.2
+
+# Doublings of the interval after which the back-off is past any maximum,
+# so long outages do not overflow the delay
+MAX_BACKOFF_DOUBLINGS = 20
+
+
+class PollScheduler:
+    """Choose the next polling interval from alert activity and failures.
+
+    While an alert is active the minimum interval is used. Otherwise the
+    interval follows how often the page changed over the last day, between
+    the configured bounds. After a failed poll the interval backs off
+    exponentially with jitter, and never undercuts a Retry-After delay.
+    """
+
+    def __init__(self, min_interval: timedelta, max_interval: timedelta, initial: timedelta) -> None:
+        """Initialize the scheduler."""
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = self._clamp(initial)
+        self.failures = 0
+        self._changes: deque[datetime] = deque()
+        # Fraction of the interval at which this agency polls, see staggered
+        self.phase: float | None = None
+
+    def set_bounds(self, min_interval: timedelta, max_interval: timedelta) -> None:
+        """Change the bounds of the interval."""
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = self._clamp(self.interval)
+
+    def record_change(self, now: datetime) -> None:
+        """Remember that the page changed at the given time."""
+        self._changes.append(now)
+
+    def next_interval(self, now: datetime, alert_active: bool) -> timedelta:
+        """Return the interval to use after a successful poll."""
+        self.failures = 0
+        while self._changes and now - self._changes[0] > CHANGE_WINDOW:
+            self._changes.popleft()
+
+        if alert_active:
+            interval = self.min_interval
+        elif not self._changes:
+            interval = self.max_interval
+        else:
+            interval = CHANGE_WINDOW / (len(self._changes) * POLLS_PER_CHANGE)
+
+        self.interval = self._clamp(interval)
+        return self.interval
+
+    def staggered(self, interval: timedelta, now: datetime) -> timedelta:
+        """Adjust an interval so the next poll lands on this agency's phase.
+
+        Polls are placed on a wall clock grid of the interval, offset by the
+        phase, so agencies with the same interval poll spread out instead of
+        in step. The poll goes to the grid point nearest to one interval from
+        now, or the one after or before it to stay within the configured
+        bounds, and the result is clamped when no grid point is within them.
+        """
+        if self.phase is None:
+            return interval
+        seconds = interval.total_seconds()
+        timestamp = now.timestamp()
+        offset = self.phase * seconds
+        target = round((timestamp + seconds - offset) / seconds) * seconds + offset
+        delay = timedelta(seconds=target - timestamp)
+        if delay < self.min_interval:
+            delay += interval
+        elif delay > self.max_interval:
+            delay -= interval
+        return self._clamp(delay)
+
+    def failure_interval(self, retry_after: float | None = None) -> timedelta:
+        """Return the interval to use after a failed poll."""
+        self.failures += 1
+        delay = self.interval * 2 ** min(self.failures - 1, MAX_BACKOFF_DOUBLINGS)
+        delay *= random.uniform(1 - BACKOFF_JITTER, 1 + BACKOFF_JITTER)
+        delay = self._clamp(delay)
+        if retry_after is not None:
+            delay = max(delay, timedelta(seconds=retry_after))
+        return delay
+
+    def probe_interval(self, retry_after: float) -> timedelta:
+        """Return the interval until a circuit breaker lets a probe through.
+
+        This is not a failed poll, so it does not add to the back-off.
+        """
+        return self._clamp(timedelta(seconds=retry_after))
+
+    def _clamp(self, interval: timedelta) -> timedelta:
+        """Keep an interval within the configured bounds."""
+        return max(self.min_interval, min(self.max_interval, interval))
@@ -3,17 +3,31 @@ from __future__ import annotations
 
 import logging
 
-from homeassistant.components.sensor import SensorEntity, SensorStateClass
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorStateClass,
+)
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory, UnitOfInformation, UnitOfTime
 from homeassistant.core import HomeAssistant
-from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import CONF_ALERT_TYPES, DOMAIN
+from .const import CONF_ALERT_TYPES, CONF_TRACE_POLLS, DOMAIN
+from .entity import NixleEntity
 
 _LOGGER = logging.getLogger(__name__)
 
+# Diagnostic sensors created when poll timings are recorded:
+# key -> (name, device class, unit)
+POLL_TRACE_SENSORS = {
+    "total": ("Poll Duration", SensorDeviceClass.DURATION, UnitOfTime.MILLISECONDS),
+    "download": ("Download Time", SensorDeviceClass.DURATION, UnitOfTime.MILLISECONDS),
+    "parse": ("Parse Time", SensorDeviceClass.DURATION, UnitOfTime.MILLISECONDS),
+    "expiry": ("Expiry Evaluation Time", SensorDeviceClass.DURATION, UnitOfTime.MILLISECONDS),
+    "bytes_received": ("Bytes Received", SensorDeviceClass.DATA_SIZE, UnitOfInformation.BYTES),
+}
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -21,12 +35,10 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up Nixle sensor based on a config entry."""
-    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
-    
-    # Extract agency name from URL
-    agency_url = entry.data["agency_url"]
-    agency_id = agency_url.split("/")[-2] if agency_url.endswith("/") else agency_url.split("/")[-1]
-    agency_name = agency_id.replace("-", " ").title()
+    data = hass.data[DOMAIN][entry.entry_id]
+    coordinator = data["coordinator"]
+    agency_id = data["agency"].agency_id
+    agency_name = data["agency"].name
     
     alert_types_filter = entry.data.get(CONF_ALERT_TYPES, [])
     
@@ -37,31 +49,19 @@ async def async_setup_entry(
         NixleAlertCountSensor(coordinator, entry, agency_name, agency_id, "community"),
         NixleLatestAlertSensor(coordinator, entry, agency_name, agency_id, alert_types_filter),
     ]
+
+    if entry.options.get(CONF_TRACE_POLLS, False):
+        sensors.extend(
+            NixlePollTraceSensor(coordinator, entry, agency_name, agency_id, key)
+            for key in POLL_TRACE_SENSORS
+        )
     
     async_add_entities(sensors)
 
 
-class NixleBaseSensor(CoordinatorEntity, SensorEntity):
+class NixleBaseSensor(NixleEntity, SensorEntity):
     """Base sensor for Nixle."""
 
-    def __init__(self, coordinator, entry, agency_name, agency_id):
-        """Initialize the sensor."""
-        super().__init__(coordinator)
-        self._entry = entry
-        self._agency_name = agency_name
-        self._agency_id = agency_id
-        
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Return device information."""
-        return DeviceInfo(
-            identifiers={(DOMAIN, self._agency_id)},
-            name=f"Nixle - {self._agency_name}",
-            manufacturer="Nixle",
-            model="Alert Service",
-            configuration_url=self._entry.data["agency_url"],
-        )
-
 
 class NixleTotalAlertsSensor(NixleBaseSensor):
     """Sensor for total alert count."""
@@ -70,15 +70,21 @@ class NixleTotalAlertsSensor(NixleBaseSensor):
         """Initialize the sensor."""
         super().__init__(coordinator, entry, agency_name, agency_id)
         self._attr_name = f"{agency_name} Total Alerts"
-        self._attr_unique_id = f"{agency_id}_total_alerts"
+        self._attr_unique_id = f"{entry.entry_id}_{agency_id}_total_alerts"
         self._attr_icon = "mdi:bell"
         self._attr_state_class = SensorStateClass.MEASUREMENT
 
+    def _derived_key(self):
+        """Return the counts and polling interval."""
+        if not self.coordinator.data:
+            return None
+        return self.coordinator.data.counts, self.coordinator.scheduler.interval
+
     @property
     def native_value(self):
         """Return the state of the sensor."""
         if self.coordinator.data:
-            return self.coordinator.data["counts"]["total"]
+            return self.coordinator.data.counts["total"]
         return 0
 
     @property
@@ -87,11 +93,14 @@ class NixleTotalAlertsSensor(NixleBaseSensor):
         if not self.coordinator.data:
             return {}
         
+        counts = self.coordinator.data.counts
         return {
-            "last_updated": self.coordinator.data.get("last_updated"),
-            "alert_count": self.coordinator.data["counts"]["alert"],
-            "advisory_count": self.coordinator.data["counts"]["advisory"],
-            "community_count": self.coordinator.data["counts"]["community"],
+            "last_updated": self.coordinator.data.last_updated,
+            "alert_count": counts["alert"],
+            "advisory_count": counts["advisory"],
+            "community_count": counts["community"],
+            "update_interval": self.coordinator.scheduler.interval.total_seconds() / 60,
+            **self._stale_attributes(),
         }
 
 
@@ -103,75 +112,147 @@ class NixleAlertCountSensor(NixleBaseSensor):
         super().__init__(coordinator, entry, agency_name, agency_id)
         self._alert_type = alert_type
         self._attr_name = f"{agency_name} {alert_type.title()} Count"
-        self._attr_unique_id = f"{agency_id}_{alert_type}_count"
+        self._attr_unique_id = f"{entry.entry_id}_{agency_id}_{alert_type}_count"
         self._attr_icon = "mdi:bell-alert" if alert_type == "alert" else "mdi:information"
         self._attr_state_class = SensorStateClass.MEASUREMENT
 
+    def _derived_key(self):
+        """Return the count for this alert type."""
+        return self.native_value
+
     @property
     def native_value(self):
         """Return the state of the sensor."""
         if self.coordinator.data:
-            return self.coordinator.data["counts"][self._alert_type]
+            return self.coordinator.data.counts[self._alert_type]
         return 0
 
 
 class NixleLatestAlertSensor(NixleBaseSensor):
     """Sensor for the latest alert."""
 
+    # Alert texts are kept out of the recorder, see the get_alerts service
+    _unrecorded_attributes = frozenset({"full_text", "recent_alerts"})
+
     def __init__(self, coordinator, entry, agency_name, agency_id, alert_types_filter):
         """Initialize the sensor."""
         super().__init__(coordinator, entry, agency_name, agency_id)
         self._alert_types_filter = alert_types_filter
         self._attr_name = f"{agency_name} Latest Alert"
-        self._attr_unique_id = f"{agency_id}_latest_alert"
+        self._attr_unique_id = f"{entry.entry_id}_{agency_id}_latest_alert"
         self._attr_icon = "mdi:bell-ring"
 
+    def _recent_alerts(self, alerts):
+        """Return the last 5 alerts, each reposted alert only once."""
+        return self.coordinator.distinct_alerts(alerts, 5)
+
+    def _derived_key(self):
+        """Return the alerts shown in the state and attributes."""
+        if not self.coordinator.data:
+            return None
+        alerts = self.coordinator.data.filtered(self._alert_types_filter)
+        return tuple(
+            (alert, cluster.sources if cluster else None)
+            for alert, cluster in self._recent_alerts(alerts)
+        )
+
     @property
     def native_value(self):
         """Return the state of the sensor."""
-        if not self.coordinator.data or not self.coordinator.data["alerts"]:
+        if not self.coordinator.data or not self.coordinator.data.alerts:
             return "No alerts"
         
         # Filter by alert types if specified
-        alerts = self.coordinator.data["alerts"]
-        if self._alert_types_filter:
-            alerts = [a for a in alerts if a["type"].lower() in self._alert_types_filter]
+        alerts = self.coordinator.data.filtered(self._alert_types_filter)
         
         if not alerts:
             return "No matching alerts"
         
         latest = alerts[0]
-        return latest["text"][:100] + ("..." if len(latest["text"]) > 100 else "")
+        return latest.text[:100] + ("..." if len(latest.text) > 100 else "")
 
     @property
     def extra_state_attributes(self):
         """Return additional attributes."""
-        if not self.coordinator.data or not self.coordinator.data["alerts"]:
+        if not self.coordinator.data or not self.coordinator.data.alerts:
             return {}
         
-        alerts = self.coordinator.data["alerts"]
-        if self._alert_types_filter:
-            alerts = [a for a in alerts if a["type"].lower() in self._alert_types_filter]
+        alerts = self.coordinator.data.filtered(self._alert_types_filter)
         
         if not alerts:
             return {}
         
         latest = alerts[0]
         
-        # Include last 5 alerts
-        recent_alerts = []
-        for alert in alerts[:5]:
-            recent_alerts.append({
-                "type": alert["type"],
-                "timestamp": alert["timestamp"],
-                "text": alert["text"],
-                "link": alert.get("link"),
-            })
+        # Include last 5 alerts, with the other agencies that posted them
+        snapshot = self.coordinator.data
+        recent_alerts = [
+            snapshot.alert_attributes(alert)
+            if cluster is None or len(cluster.sources) < 2
+            else {**snapshot.alert_attributes(alert), **cluster.attributes()}
+            for alert, cluster in self._recent_alerts(alerts)
+        ]
         
         return {
-            "type": latest["type"],
-            "timestamp": latest["timestamp"],
-            "full_text": latest["text"],
-            "link": latest.get("link"),
+            "type": latest.type.value,
+            "timestamp": latest.timestamp,
+            "full_text": latest.full_text or latest.text,
+            "link": latest.link,
             "recent_alerts": recent_alerts,
+            **self._stale_attributes(),
+        }
+
+
+class NixlePollTraceSensor(NixleBaseSensor):
+    """Diagnostic sensor for the timings of the latest poll."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, coordinator, entry, agency_name, agency_id, key):
+        """Initialize the sensor."""
+        super().__init__(coordinator, entry, agency_name, agency_id)
+        self._key = key
+        name, device_class, unit = POLL_TRACE_SENSORS[key]
+        self._attr_name = f"{agency_name} {name}"
+        self._attr_unique_id = f"{entry.entry_id}_{agency_id}_poll_{key}"
+        self._attr_icon = "mdi:timer-outline"
+        self._attr_device_class = device_class
+        self._attr_native_unit_of_measurement = unit
+
+    def _latest_trace(self):
+        """Return the latest poll trace that has a value for this sensor.
+
+        Polls that found the page unchanged are not parsed, so the parse
+        and expiry sensors show the latest poll that was.
+        """
+        for trace in reversed(self.coordinator.api.poll_traces):
+            if self._key == "bytes_received" or self._key in trace.spans:
+                return trace
+        return None
+
+    def _derived_key(self):
+        """Return the trace the sensor is showing."""
+        return self._latest_trace()
+
+    @property
+    def native_value(self):
+        """Return the state of the sensor."""
+        if (trace := self._latest_trace()) is None:
+            return None
+        if self._key == "bytes_received":
+            return trace.bytes_received
+        return trace.spans[self._key]
+
+    @property
+    def extra_state_attributes(self):
+        """Return the other counters of the poll."""
+        if (trace := self._latest_trace()) is None:
+            return {}
+        return {
+            "started": trace.started.isoformat(),
+            "outcome": trace.outcome,
+            "pages": trace.pages,
+            "items_scanned": trace.items_scanned,
+            "alerts": trace.alerts,
         }
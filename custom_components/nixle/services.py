@@ -0,0 +1,141 @@
+"""Services of the Nixle integration."""
+from __future__ import annotations
+
+import voluptuous as vol
+
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+)
+from homeassistant.exceptions import ServiceValidationError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from .const import ALERT_TYPES, DOMAIN, SERVICE_GET_ALERTS, SERVICE_SEARCH_ALERTS
+from .coordinator import get_agency_registry, normalize_agency_url
+from .history import MAX_SEARCH_RESULTS, NixleHistoryError
+from .models import Alert
+
+ATTR_QUERY = "query"
+ATTR_AGENCY_URL = "agency_url"
+ATTR_ALERT_TYPES = "alert_types"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_LIMIT = "limit"
+ATTR_ACTIVE_ONLY = "active_only"
+
+# Alert type labels by the lowercase keys used in options
+_TYPE_LABELS = {key: label for label, key in ALERT_TYPES.items()}
+
+SEARCH_ALERTS_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_QUERY): cv.string,
+        vol.Optional(ATTR_AGENCY_URL): cv.url,
+        vol.Optional(ATTR_ALERT_TYPES): vol.All(
+            cv.ensure_list, [vol.In(list(_TYPE_LABELS))]
+        ),
+        vol.Optional(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+        vol.Optional(ATTR_LIMIT, default=50): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=MAX_SEARCH_RESULTS)
+        ),
+    }
+)
+
+GET_ALERTS_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_AGENCY_URL): cv.url,
+        vol.Optional(ATTR_ALERT_TYPES): vol.All(
+            cv.ensure_list, [vol.In(list(_TYPE_LABELS))]
+        ),
+        vol.Optional(ATTR_ACTIVE_ONLY, default=False): cv.boolean,
+        vol.Optional(ATTR_LIMIT, default=50): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=MAX_SEARCH_RESULTS)
+        ),
+    }
+)
+
+
+def _as_aware(value):
+    """Return a datetime in the local time zone if it has none."""
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
+
+
+def _alert_data(agency_url: str, alert: Alert) -> dict:
+    """Return an alert as returned by the get_alerts service."""
+    return {
+        "agency_url": agency_url,
+        "id": alert.id,
+        "type": alert.type.value,
+        "timestamp": alert.timestamp,
+        "posted": alert.posted.isoformat(),
+        "text": alert.text,
+        "full_text": alert.full_text or alert.text,
+        "link": alert.link,
+        "expires": alert.expiry.isoformat() if alert.expiry else None,
+    }
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the services of the integration."""
+
+    async def async_search_alerts(call: ServiceCall) -> ServiceResponse:
+        """Search the alert history, without contacting Nixle."""
+        history = get_agency_registry(hass).history
+        agency_url = call.data.get(ATTR_AGENCY_URL)
+        try:
+            alerts = await history.async_search(
+                query=call.data.get(ATTR_QUERY),
+                agency_url=normalize_agency_url(agency_url) if agency_url else None,
+                alert_types=[_TYPE_LABELS[key] for key in call.data.get(ATTR_ALERT_TYPES, [])],
+                start=_as_aware(call.data.get(ATTR_START)),
+                end=_as_aware(call.data.get(ATTR_END)),
+                limit=call.data[ATTR_LIMIT],
+            )
+        except NixleHistoryError as err:
+            raise ServiceValidationError(f"Invalid search query: {err}") from err
+        return {"alerts": alerts}
+
+    async def async_get_alerts(call: ServiceCall) -> ServiceResponse:
+        """Return the alerts currently on the agency pages, from the last poll."""
+        coordinators = get_agency_registry(hass).coordinators()
+        if agency_url := call.data.get(ATTR_AGENCY_URL):
+            key = normalize_agency_url(agency_url)
+            if key not in coordinators:
+                raise ServiceValidationError(f"No Nixle agency configured for {agency_url}")
+            coordinators = {key: coordinators[key]}
+        alert_types = call.data.get(ATTR_ALERT_TYPES)
+        alerts = []
+        for key, coordinator in coordinators.items():
+            if (snapshot := coordinator.data) is None:
+                continue
+            selected = snapshot.filtered(alert_types)
+            if call.data[ATTR_ACTIVE_ONLY]:
+                active = {alert.id for alert in coordinator.active.alerts}
+                selected = [alert for alert in selected if alert.id in active]
+            alerts.extend((key, alert) for alert in selected)
+        alerts.sort(key=lambda item: item[1].posted, reverse=True)
+        return {
+            "alerts": [
+                _alert_data(key, alert) for key, alert in alerts[: call.data[ATTR_LIMIT]]
+            ]
+        }
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_ALERTS,
+        async_get_alerts,
+        schema=GET_ALERTS_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SEARCH_ALERTS,
+        async_search_alerts,
+        schema=SEARCH_ALERTS_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
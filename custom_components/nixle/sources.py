@@ -0,0 +1,141 @@
+"""Sources NixleAPI can read the alerts of an agency from."""
+from __future__ import annotations
+
+import logging
+import os
+from abc import ABC, abstractmethod
+from collections.abc import Awaitable, Callable
+from datetime import timedelta
+from typing import TYPE_CHECKING
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant
+from homeassistant.helpers.event import async_track_time_interval
+
+from .page_reader import PageRead, async_read_alert_rows
+
+if TYPE_CHECKING:
+    from .nixle_api import NixleAPI
+
+_LOGGER = logging.getLogger(__name__)
+
+# How often a local feed file is checked for changes
+FILE_WATCH_INTERVAL = timedelta(seconds=5)
+
+
+class AlertSource(ABC):
+    """Where the alert rows of an agency are read from."""
+
+    # Whether pages after the first one can be read
+    paged = False
+
+    @abstractmethod
+    async def async_read(self, api: NixleAPI, page: int, conditional: bool) -> PageRead | None:
+        """Return the alert rows of a page, or None if unchanged since the last read."""
+
+    def async_watch(
+        self, hass: HomeAssistant, on_change: Callable[[], Awaitable[None]]
+    ) -> CALLBACK_TYPE | None:
+        """Call on_change when the source changes, if it can tell.
+
+        Returns a function that stops watching, or None if the source can
+        only be polled.
+        """
+        return None
+
+
+class PageSource(AlertSource):
+    """The HTML alert pages of the agency."""
+
+    paged = True
+
+    def __repr__(self) -> str:
+        """Return a short description for diagnostics."""
+        return "PageSource()"
+
+    async def async_read(self, api: NixleAPI, page: int, conditional: bool) -> PageRead | None:
+        """Download and parse an alert page."""
+        return await api.async_fetch(
+            f"{api.agency_url}/?page={page}", async_read_alert_rows, conditional
+        )
+
+
+class FeedSource(AlertSource):
+    """An RSS or Atom feed of the agency's alerts, served over HTTP."""
+
+    def __init__(self, url: str) -> None:
+        """Initialize the source."""
+        self.url = url
+
+    def __repr__(self) -> str:
+        """Return a short description for diagnostics."""
+        return f"FeedSource({self.url!r})"
+
+    async def async_read(self, api: NixleAPI, page: int, conditional: bool) -> PageRead | None:
+        """Download and parse the feed."""
+        # Only imported when a feed is used, see warmup
+        from .feed_reader import async_read_feed_rows
+
+        return await api.async_fetch(self.url, async_read_feed_rows, conditional)
+
+
+class FeedFileSource(AlertSource):
+    """A local RSS or Atom file, such as one written by a mail or feed fetcher.
+
+    The file is only read again when its modification time changes, and
+    it is checked every FILE_WATCH_INTERVAL so new alerts show up within
+    seconds.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Initialize the source."""
+        self.path = path
+        self._mtime: float | None = None
+
+    def __repr__(self) -> str:
+        """Return a short description for diagnostics."""
+        return f"FeedFileSource({self.path!r})"
+
+    async def async_read(self, api: NixleAPI, page: int, conditional: bool) -> PageRead | None:
+        """Parse the file if it changed."""
+        mtime = await api.hass.async_add_executor_job(os.path.getmtime, self.path)
+        if conditional and mtime == self._mtime and api.has_result:
+            return None
+        read = await api.hass.async_add_executor_job(self._read, api.max_page_size)
+        self._mtime = mtime
+        return read
+
+    def _read(self, max_bytes: int) -> PageRead:
+        """Read and parse the file."""
+        from .feed_reader import parse_feed
+
+        with open(self.path, "rb") as file:
+            data = file.read(max_bytes + 1)
+        if len(data) > max_bytes:
+            raise ValueError(f"{self.path} is larger than {max_bytes} bytes")
+        return parse_feed(data)
+
+    def async_watch(
+        self, hass: HomeAssistant, on_change: Callable[[], Awaitable[None]]
+    ) -> CALLBACK_TYPE:
+        """Call on_change when the modification time of the file changes."""
+
+        async def _async_check(_now) -> None:
+            try:
+                mtime = await hass.async_add_executor_job(os.path.getmtime, self.path)
+            except OSError:
+                return
+            if self._mtime is not None and mtime != self._mtime:
+                await on_change()
+
+        return async_track_time_interval(
+            hass, _async_check, FILE_WATCH_INTERVAL, name=f"nixle watch {self.path}"
+        )
+
+
+def create_source(location: str | None) -> AlertSource:
+    """Return the source for a feed URL or file path, or the HTML pages if there is none."""
+    if not location:
+        return PageSource()
+    if location.startswith(("http://", "https://")):
+        return FeedSource(location)
+    return FeedFileSource(location)
@@ -0,0 +1,25 @@
+"""Preparation of the parsers, off the event loop and during the first fetch."""
+from __future__ import annotations
+
+from .alert_dates import get_expiry_rule_set
+from .alert_parser import parse_alerts
+from .clustering import simhash
+
+# A page with one alert, enough to run every path of the parser once
+_SAMPLE_PAGE = (
+    "<ul><li class='alert'><div class='type'>Alert</div><h2>Entered: 1 hour ago</h2>"
+    "<p>Nixle warm-up</p><a href='https://nixle.us/warmup'>More</a></li></ul>"
+)
+
+
+def warm_up(feed: bool = False) -> None:
+    """Compile the expiry rules and build the parser tables.
+
+    Imports the feed parser too if a feed is used. This is CPU bound and
+    must not be called from the event loop.
+    """
+    get_expiry_rule_set()
+    parse_alerts(_SAMPLE_PAGE)
+    simhash(_SAMPLE_PAGE)
+    if feed:
+        from . import feed_reader  # noqa: F401
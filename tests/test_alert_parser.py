@@ -0,0 +1,71 @@
+"""Parity of the single-pass alert parser with the BeautifulSoup extraction it replaced."""
+from __future__ import annotations
+
+import re
+from pathlib import Path
+
+import pytest
+
+# Skip before importing the integration, which needs Home Assistant
+pytest.importorskip("homeassistant")
+BeautifulSoup = pytest.importorskip("bs4").BeautifulSoup
+
+from custom_components.nixle.alert_parser import NixleAlertParser, parse_alerts  # noqa: E402
+
+FIXTURES = Path(__file__).parent / "fixtures"
+PAGES = sorted(path.name for path in FIXTURES.glob("*.html"))
+
+
+def bs4_alerts(html: str) -> list[tuple]:
+    """Extract the alert rows the way NixleAPI did with BeautifulSoup."""
+    soup = BeautifulSoup(html, "html.parser")
+    alerts = []
+    for item in soup.find_all("li"):
+        alert_type_elem = item.find(
+            string=lambda text: text and text.strip() in ["Alert", "Advisory", "Community"]
+        )
+        if not alert_type_elem:
+            continue
+        alert_type = alert_type_elem.strip()
+
+        time_elem = item.find("h2")
+        time_text = time_elem.get_text(strip=True) if time_elem else "Unknown"
+
+        text_elem = None
+        for sibling in item.find_all(string=True):
+            text = sibling.strip()
+            if text and text not in [alert_type, time_text, "More »"]:
+                if len(text) > 20:
+                    text_elem = text
+                    break
+        alert_text = text_elem if text_elem else "No description available"
+
+        link_elem = item.find("a", href=re.compile(r"nixle\.us/"))
+        link = link_elem["href"] if link_elem else None
+
+        alerts.append((alert_type, time_text, alert_text, link))
+    return alerts
+
+
+@pytest.fixture(params=PAGES)
+def page(request) -> str:
+    """Return the HTML of a saved agency page."""
+    return (FIXTURES / request.param).read_text(encoding="utf-8")
+
+
+def test_parity(page: str) -> None:
+    """Both parsers give the same rows for a saved page."""
+    expected = bs4_alerts(page)
+    assert expected
+    assert parse_alerts(page) == expected
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1024])
+def test_parity_in_chunks(page: str, chunk_size: int) -> None:
+    """Feeding the page in chunks does not change the rows."""
+    parser = NixleAlertParser()
+    for start in range(0, len(page), chunk_size):
+        parser.feed(page[start : start + chunk_size])
+    parser.close()
+    assert parser.alerts == bs4_alerts(page)
+
@@ -0,0 +1,66 @@
+"""Tests of the near-duplicate alert clustering."""
+from __future__ import annotations
+
+import pytest
+
+# Skip before importing the integration, which needs Home Assistant
+pytest.importorskip("homeassistant")
+
+from custom_components.nixle.clustering import MAX_DISTANCE, AlertClusterIndex  # noqa: E402
+from custom_components.nixle.models import create_alerts  # noqa: E402
+
+# A long template, so alerts that only differ in the date are a few bits apart
+SNOW_EMERGENCY = " ".join([
+    "The City of Springfield has declared a snow emergency for {weekday} night, January {day}.",
+    "A parking ban will be in effect on all snow routes and main arteries from 8 PM until",
+    "6 AM the following morning. Vehicles parked on snow routes during the ban will be",
+    "ticketed and towed at the owner's expense. Residents may park in municipal lots and",
+    "school parking areas free of charge during the emergency. Please visit the city website",
+    "for a list of lots and updates on plowing operations. Trash and recycling collection",
+    "will proceed on the regular schedule unless otherwise announced. Sidewalks must be",
+    "cleared within twenty four hours after the snow stops falling. Please check on elderly",
+    "neighbors and keep fire hydrants near your home clear of snow. Do not plow or shovel",
+    "snow into the street. Thank you for your cooperation and stay safe. Trash and recycling",
+    "collection will proceed on the regular schedule unless otherwise announced. Sidewalks",
+    "must be cleared within twenty four hours after the snow stops falling. Kindly check on",
+    "elderly neighbors and keep fire hydrants near your home clear of snow. Do not plow or",
+    "shovel snow into the street. Thank you for your cooperation and stay safe.",
+])
+
+
+def snow_emergencies(agency: str, *dates: tuple[str, str]):
+    """Return the alert records of an agency page with a snow emergency per date."""
+    return create_alerts([
+        (
+            "Alert",
+            "Entered: 2 hours ago",
+            SNOW_EMERGENCY.format(weekday=weekday, day=day),
+            f"https://nixle.us/{agency}{index}",
+        )
+        for index, (weekday, day) in enumerate(dates)
+    ])
+
+
+def test_dates_of_one_template_are_not_merged() -> None:
+    """Alerts of one agency that only differ in the date stay apart."""
+    monday, wednesday = snow_emergencies("a", ("Monday", "3rd"), ("Wednesday", "5th"))
+    assert (monday.fingerprint ^ wednesday.fingerprint).bit_count() <= MAX_DISTANCE
+    assert monday.expiry != wednesday.expiry
+
+    index = AlertClusterIndex()
+    index.update("a", [monday, wednesday])
+    assert [alert for alert, _ in index.distinct("a", [monday, wednesday])] == [monday, wednesday]
+
+
+def test_reposts_are_merged() -> None:
+    """The same alert posted by two agencies is one cluster with both sources."""
+    (ours,) = snow_emergencies("a", ("Monday", "3rd"))
+    (theirs,) = snow_emergencies("b", ("Monday", "3rd"))
+    changed = []
+    index = AlertClusterIndex(changed.extend)
+    index.update("a", [ours])
+    index.update("b", [theirs])
+
+    (cluster,) = index.shared("a")
+    assert cluster.sources == ("a", "b")
+    assert changed == ["a"]
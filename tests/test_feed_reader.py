@@ -0,0 +1,181 @@
+"""Tests of the RSS and Atom feed reader."""
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+# Skip before importing the integration, which needs Home Assistant
+pytest.importorskip("homeassistant")
+
+from custom_components.nixle.feed_reader import (  # noqa: E402
+    FeedParser,
+    _parse_time,
+    async_read_feed_rows,
+    parse_feed,
+)
+from homeassistant.util import dt as dt_util  # noqa: E402
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+# (type, posted, text, link) of the saved feeds, newest first
+RSS_ROWS = [
+    (
+        "Alert",
+        datetime(2026, 10, 17, 0, 30, tzinfo=timezone.utc),
+        "A snow emergency parking ban has been declared for tonight, Sunday, October 18",
+        "https://nixle.us/CF2K7",
+    ),
+    (
+        "Advisory",
+        datetime(2026, 10, 16, 14, 0, tzinfo=timezone.utc),
+        "Road closure on Main Street between Elm and Oak for water main repairs",
+        "https://nixle.us/CF2A1",
+    ),
+    (
+        "Community",
+        datetime(2026, 10, 14, 13, 15, tzinfo=timezone.utc),
+        "Leaf pickup begins next week. Leave bagged leaves at the curb.",
+        "https://nixle.us/CEZ93",
+    ),
+    ("Community", None, "Coffee with a Cop at the Boston Road library branch", "https://nixle.us/CEW55"),
+]
+ATOM_ROWS = [
+    (
+        "Advisory",
+        datetime(2026, 10, 17, 2, 0, tzinfo=timezone.utc),
+        "Highway 74 is closed in both directions at Ortega Oaks",
+        "https://nixle.us/DA7M0",
+    ),
+    (
+        "Alert",
+        datetime(2026, 10, 17, 0, 20, tzinfo=timezone.utc),
+        "Evacuation warning for the Canyon Lake area due to the Ridge fire",
+        "https://nixle.us/DA7Q2",
+    ),
+    (
+        "Community",
+        datetime(2026, 10, 15, 16, 0, tzinfo=timezone.utc),
+        "Free community shred event at the sheriff's station",
+        None,
+    ),
+]
+
+
+def posted(rows: list[tuple]) -> list[tuple]:
+    """Replace the ISO 8601 timestamps of rows with datetimes."""
+    return [
+        (alert_type, dt_util.parse_datetime(timestamp) if timestamp else None, text, link)
+        for alert_type, timestamp, text, link in rows
+    ]
+
+
+def read_fixture(name: str) -> bytes:
+    """Return a saved feed."""
+    return (FIXTURES / name).read_bytes()
+
+
+@pytest.mark.parametrize(("name", "rows", "items"), [
+    ("feed.rss", RSS_ROWS, 5),
+    ("feed.atom", ATOM_ROWS, 3),
+])
+def test_parse_feed(name: str, rows: list[tuple], items: int) -> None:
+    """Items become rows, newest first, and items without text are dropped."""
+    read = parse_feed(read_fixture(name))
+    assert posted(read.rows) == rows
+    assert read.items_scanned == items
+    assert not read.truncated
+
+
+@pytest.mark.parametrize("name", ["feed.rss", "feed.atom"])
+@pytest.mark.parametrize("chunk_size", [1, 7, 1024])
+def test_feed_in_chunks(name: str, chunk_size: int) -> None:
+    """Feeding a feed in chunks gives the same rows."""
+    data = read_fixture(name)
+    parser = FeedParser()
+    for start in range(0, len(data), chunk_size):
+        parser.feed(data[start : start + chunk_size])
+    parser.close()
+    assert parser.alerts == parse_feed(data).rows
+
+
+def test_invalid_feed() -> None:
+    """A feed that is not well-formed XML is an error."""
+    with pytest.raises(ValueError):
+        parse_feed(read_fixture("feed.rss")[:-20])
+
+
+@pytest.mark.parametrize(("value", "expected"), [
+    ("Fri, 16 Oct 2026 14:00:00 +0000", datetime(2026, 10, 16, 14, tzinfo=timezone.utc)),
+    ("Wed, 14 Oct 2026 09:15:00 -0400", datetime(2026, 10, 14, 13, 15, tzinfo=timezone.utc)),
+    ("2026-10-16T19:00:00-07:00", datetime(2026, 10, 17, 2, tzinfo=timezone.utc)),
+    ("", None),
+    ("yesterday", None),
+])
+def test_parse_time(value: str, expected: datetime | None) -> None:
+    """RSS and Atom dates are parsed, anything else is None."""
+    assert _parse_time(value) == expected
+
+
+def test_parse_time_without_zone() -> None:
+    """A date without a time zone is in the local time zone."""
+    parsed = _parse_time("2026-10-16T14:00:00")
+    assert parsed.tzinfo is dt_util.DEFAULT_TIME_ZONE
+    assert parsed.replace(tzinfo=None) == datetime(2026, 10, 16, 14)
+
+
+class FakeStream:
+    """The body of a response, read in chunks of at most chunk_size bytes."""
+
+    def __init__(self, data: bytes, chunk_size: int) -> None:
+        """Initialize the stream."""
+        self.data = data
+        self.chunk_size = chunk_size
+        self.position = 0
+
+    async def read(self, size: int) -> bytes:
+        """Return the next bytes."""
+        end = self.position + min(size, self.chunk_size)
+        chunk = self.data[self.position : end]
+        self.position += len(chunk)
+        return chunk
+
+
+class FakeResponse:
+    """The parts of an aiohttp response the reader uses."""
+
+    url = "https://local.nixle.com/springfield-pd/rss"
+
+    def __init__(self, data: bytes, chunk_size: int) -> None:
+        """Initialize the response."""
+        self.content = FakeStream(data, chunk_size)
+        self.closed = False
+
+    def close(self) -> None:
+        """Close the connection."""
+        self.closed = True
+
+
+async def run_parser(func, *args):
+    """Run a parser step inline."""
+    return func(*args)
+
+
+@pytest.mark.parametrize("chunk_size", [7, 64 * 1024])
+def test_read_feed_rows(chunk_size: int) -> None:
+    """A downloaded feed gives the same rows as the saved file."""
+    data = read_fixture("feed.rss")
+    read = asyncio.run(async_read_feed_rows(FakeResponse(data, chunk_size), 1024 * 1024, run_parser))
+    assert read.rows == parse_feed(data).rows
+    assert read.bytes_received == len(data)
+
+
+def test_read_feed_too_large() -> None:
+    """A feed larger than the limit is an error, not a cut feed."""
+    data = read_fixture("feed.rss")
+    response = FakeResponse(data, 64)
+    with pytest.raises(ValueError):
+        asyncio.run(async_read_feed_rows(response, len(data) - 1, run_parser))
+    assert response.closed
@@ -0,0 +1,132 @@
+"""Tests of the streaming page reader and the alert region hash."""
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+import pytest
+
+# Skip before importing the integration, which needs Home Assistant
+pytest.importorskip("homeassistant")
+
+from custom_components.nixle.alert_parser import NixleAlertParser, parse_alerts  # noqa: E402
+from custom_components.nixle.page_reader import (  # noqa: E402
+    DRAIN_LIMIT,
+    alert_region_hash,
+    async_read_alert_rows,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+# A footer larger than a read and DRAIN_LIMIT together, so a reader that
+# stops at the end of the alert list closes the connection instead of
+# reading it
+FOOTER = "<footer>" + "<p>Powered by Nixle</p>" * (DRAIN_LIMIT // 8) + "</footer>"
+
+
+class FakeStream:
+    """The body of a response, read in chunks of at most chunk_size bytes."""
+
+    def __init__(self, data: bytes, chunk_size: int) -> None:
+        """Initialize the stream."""
+        self.data = data
+        self.chunk_size = chunk_size
+        self.position = 0
+
+    async def read(self, size: int) -> bytes:
+        """Return the next bytes."""
+        end = self.position + min(size, self.chunk_size)
+        chunk = self.data[self.position : end]
+        self.position += len(chunk)
+        return chunk
+
+    def at_eof(self) -> bool:
+        """Return True once the whole body was read."""
+        return self.position >= len(self.data)
+
+
+class FakeResponse:
+    """The parts of an aiohttp response the reader uses."""
+
+    charset = "utf-8"
+    url = "https://local.nixle.com/springfield-pd/"
+
+    def __init__(self, html: str, chunk_size: int) -> None:
+        """Initialize the response."""
+        self.content = FakeStream(html.encode(), chunk_size)
+        self.closed = False
+
+    def close(self) -> None:
+        """Close the connection."""
+        self.closed = True
+
+
+def agency_page() -> str:
+    """Return the saved agency page with a large footer."""
+    html = (FIXTURES / "agency_page.html").read_text(encoding="utf-8")
+    return html.replace("<footer>", FOOTER + "<footer>", 1)
+
+
+def read(html: str, chunk_size: int, known_hash: str | None = None):
+    """Read a page, return the result, the response and the parser steps run."""
+    response = FakeResponse(html, chunk_size)
+    steps = []
+
+    async def run_parser(func, *args):
+        steps.append(func)
+        return func(*args)
+
+    result = asyncio.run(
+        async_read_alert_rows(response, 1024 * 1024, run_parser, None, known_hash)
+    )
+    return result, response, steps
+
+
+def test_region_hash_ignores_head() -> None:
+    """A token in <head> is not part of the alert region, <link> included."""
+    html = agency_page()
+    assert "<link" in html
+    assert alert_region_hash(html) == alert_region_hash(html.replace("6f1c2e0a9b", "0d4e7b9c31"))
+
+
+def test_region_hash_changes_with_alerts() -> None:
+    """Any change to the alert list changes the hash."""
+    html = agency_page()
+    assert alert_region_hash(html) != alert_region_hash(html.replace("2 hours ago", "3 hours ago"))
+    assert alert_region_hash(html) != alert_region_hash(
+        html.replace("</ul>\n    <div", "<li><span>Alert</span></li></ul>\n    <div", 1)
+    )
+
+
+@pytest.mark.parametrize("chunk_size", [7, 1024, 64 * 1024])
+def test_read_stops_at_list_end(chunk_size: int) -> None:
+    """Reading stops once the alert list has ended."""
+    html = agency_page()
+    result, response, _ = read(html, chunk_size)
+    assert result.rows == parse_alerts(html)
+    assert result.content_hash == alert_region_hash(html)
+    assert result.bytes_received < len(html.encode())
+    assert response.closed
+
+
+@pytest.mark.parametrize("chunk_size", [7, 1024, 64 * 1024])
+def test_read_unchanged_page(chunk_size: int) -> None:
+    """A page whose alert region matches the known hash is not parsed."""
+    html = agency_page()
+    known_hash = alert_region_hash(html)
+    result, response, steps = read(html.replace("6f1c2e0a9b", "0d4e7b9c31"), chunk_size, known_hash)
+    assert result.rows is None
+    assert result.content_hash == known_hash
+    assert NixleAlertParser.feed not in [getattr(step, "__func__", step) for step in steps]
+    assert result.bytes_received < len(html.encode())
+    assert response.closed
+
+
+@pytest.mark.parametrize("chunk_size", [7, 1024, 64 * 1024])
+def test_read_changed_page(chunk_size: int) -> None:
+    """A page whose alert region differs from the known hash is parsed."""
+    html = agency_page()
+    changed = html.replace("2 hours ago", "3 hours ago")
+    result, _, _ = read(changed, chunk_size, alert_region_hash(html))
+    assert result.rows == parse_alerts(changed)
+    assert result.content_hash == alert_region_hash(changed)
@@ -0,0 +1,33 @@
+"""Tests of the poll scheduler."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+# Skip before importing the integration, which needs Home Assistant
+pytest.importorskip("homeassistant")
+
+from custom_components.nixle.scheduler import PollScheduler  # noqa: E402
+
+MIN_INTERVAL = timedelta(minutes=5)
+MAX_INTERVAL = timedelta(minutes=60)
+START = datetime(2026, 1, 5, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("minutes", [5, 15, 60])
+@pytest.mark.parametrize("phase", [0.0, 0.3, 0.9])
+def test_staggered_stays_within_bounds(minutes: int, phase: float) -> None:
+    """Staggered polls land on the agency's phase without leaving the bounds."""
+    scheduler = PollScheduler(MIN_INTERVAL, MAX_INTERVAL, MAX_INTERVAL)
+    scheduler.phase = phase
+    interval = timedelta(minutes=minutes)
+    for second in range(0, 2 * minutes * 60, 37):
+        now = START + timedelta(seconds=second)
+        delay = scheduler.staggered(interval, now)
+        assert MIN_INTERVAL <= delay <= MAX_INTERVAL
+        if minutes < 60:
+            # The bounds leave room for a grid point, so the phase is kept
+            seconds = interval.total_seconds()
+            remainder = ((now + delay).timestamp() - phase * seconds) % seconds
+            assert min(remainder, seconds - remainder) < 1e-3
@@ -0,0 +1,68 @@
+"""Tests of the sources NixleAPI reads alerts from."""
+from __future__ import annotations
+
+import asyncio
+import os
+import shutil
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Skip before importing the integration, which needs Home Assistant
+pytest.importorskip("homeassistant")
+
+from custom_components.nixle.sources import FeedFileSource  # noqa: E402
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+class FakeHass:
+    """Runs executor jobs inline."""
+
+    async def async_add_executor_job(self, func, *args):
+        """Run a job."""
+        return func(*args)
+
+
+def fake_api(has_result: bool) -> SimpleNamespace:
+    """Return the parts of a NixleAPI a source uses."""
+    return SimpleNamespace(hass=FakeHass(), max_page_size=1024 * 1024, has_result=has_result)
+
+
+def test_feed_file_unchanged() -> None:
+    """An unchanged file is not read again once there is a result."""
+    source = FeedFileSource(str(FIXTURES / "feed.rss"))
+    api = fake_api(True)
+    assert asyncio.run(source.async_read(api, 1, True)).rows
+    assert asyncio.run(source.async_read(api, 1, True)) is None
+    assert asyncio.run(source.async_read(api, 1, False)).rows
+
+
+def test_feed_file_read_again_without_result() -> None:
+    """An unchanged file is read again while the last read left no result."""
+    source = FeedFileSource(str(FIXTURES / "feed.rss"))
+    api = fake_api(False)
+    assert asyncio.run(source.async_read(api, 1, True)).rows
+    assert asyncio.run(source.async_read(api, 1, True)).rows
+
+
+def test_feed_file_changed(tmp_path: Path) -> None:
+    """A file is read again once its modification time changes."""
+    path = tmp_path / "feed.xml"
+    shutil.copy(FIXTURES / "feed.rss", path)
+    source = FeedFileSource(str(path))
+    api = fake_api(True)
+    assert len(asyncio.run(source.async_read(api, 1, True)).rows) == 4
+    shutil.copy(FIXTURES / "feed.atom", path)
+    os.utime(path, (0, 0))
+    assert len(asyncio.run(source.async_read(api, 1, True)).rows) == 3
+
+
+def test_feed_file_too_large() -> None:
+    """A file larger than the page size limit is an error."""
+    source = FeedFileSource(str(FIXTURES / "feed.rss"))
+    api = fake_api(False)
+    api.max_page_size = 100
+    with pytest.raises(ValueError):
+        asyncio.run(source.async_read(api, 1, True))